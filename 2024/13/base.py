@@ -1,7 +1,26 @@
 import heapq
-from typing import NamedTuple, Generator
+import math
+import mmap
+import os
+import random
+import time
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from pathlib import Path
+from typing import NamedTuple, Generator, Iterable, TextIO
 import re
 
+from solution_cache import SolutionCache
+
+INPUT_FILE = Path(__file__).resolve().parent / "base_input.txt"
+
+# one claw machine block, whitespace between its lines is free so blank lines and \r\n endings are accepted
+BLOCK_PATTERN = re.compile(rb"Button A: X\+(\d+), Y\+(\d+)\s+Button B: X\+(\d+), Y\+(\d+)\s+Prize: X=(\d+), Y=(\d+)")
+# blocks taking longer than this many seconds are marked as timed out in main
+BLOCK_TIME_LIMIT = 60.0
+# how many queue pops the search does between checks of the time limit
+TIME_CHECK_INTERVAL = 1024
+
 
 class Point2(NamedTuple):
     x: int
@@ -44,21 +63,41 @@ class SpacePosition(NamedTuple):
     cost: int
     point: Point2
 
+class BlockResult(NamedTuple):
+    index: int
+    cost: int | None
+    timed_out: bool
+
+
 class SearchSpace:
 
-    def __init__(self, target: Point2, a_move: Point2, b_move: Point2):
+    def __init__(self, target: Point2, a_move: Point2, b_move: Point2, a_price: int = 3, b_price: int = 1):
         self.target = target
         self.a_move = a_move
         self.b_move = b_move
-        self.a_price = 3
-        self.b_price = 1
+        self.a_price = a_price
+        self.b_price = b_price
 
     def move_target(self, move: Point2):
         self.target += move
 
-    def bfs(self) -> int | None:
+    def normalized_key(self) -> tuple[int, ...]:
+        """Returns the machine parameters with each axis divided by the gcd of its moves and target.
+        Button presses solve both axes independently of such scaling, so machines with equal keys
+        have equal solutions."""
+        x_gcd = math.gcd(self.a_move.x, self.b_move.x, self.target.x) or 1
+        y_gcd = math.gcd(self.a_move.y, self.b_move.y, self.target.y) or 1
+        return (self.a_move.x // x_gcd, self.a_move.y // y_gcd,
+                self.b_move.x // x_gcd, self.b_move.y // y_gcd,
+                self.target.x // x_gcd, self.target.y // y_gcd,
+                self.a_price, self.b_price)
+
+    def bfs(self, time_limit: float | None = None) -> int | None:
+        """Finds the cheapest way to the target. Raises TimeoutError if time_limit seconds pass before that."""
+        deadline = None if time_limit is None else time.monotonic() + time_limit
         priority_queue: list[SpacePosition] = []
         visited: set[Point2] = set()
+        pops = 0
 
         # Initialize
         start_position = SpacePosition(0, Point2(0, 0))  # Assuming starting point (0, 0)
@@ -67,6 +106,9 @@ class SearchSpace:
         while priority_queue:
             # Retrieve current node
             current = heapq.heappop(priority_queue)
+            pops += 1
+            if deadline is not None and pops % TIME_CHECK_INTERVAL == 0 and time.monotonic() > deadline:
+                raise TimeoutError(f"Search didn't finish in {time_limit} seconds.")
 
             # Check if target is reached
             if current.point == self.target:
@@ -89,77 +131,161 @@ class SearchSpace:
 
 def parse_search_spaces(file_path: str) -> Generator[SearchSpace, None, None]:
     """
-    Parses a text file into a generator of SearchSpace objects as the file is read line by line.
+    Parses a text file into a generator of SearchSpace objects as the blocks are matched in the mapped file.
 
     :param file_path: Path to the text file containing SearchSpace definitions.
     :return: A generator that yields SearchSpace objects.
     """
-    # Use a buffer to accumulate lines of a single block (3 lines per block)
-    buffer = []
-
-    # Open the file and process it lazily
-    with open(file_path, 'r') as file:
-        for line in file:
-            line = line.strip()  # Remove whitespace (e.g., newlines)
-            if line:  # Add non-empty lines to the buffer
-                buffer.append(line)
+    for a_x, a_y, b_x, b_y, prize_x, prize_y in iter_blocks(file_path):
+        yield SearchSpace(
+            target=Point2(prize_x, prize_y),
+            a_move=Point2(a_x, a_y),
+            b_move=Point2(b_x, b_y),
+        )
 
-            # A block is complete when we have 3 lines (Button A, Button B, Prize)
-            if len(buffer) == 3:
-                # Process the block to create a SearchSpace object
-                yield _create_search_space_from_block(buffer)
-                buffer = []  # Clear the buffer for the next block
 
-
-def _create_search_space_from_block(block: list) -> SearchSpace:
+def iter_blocks(file_path: str) -> Generator[tuple[int, int, int, int, int, int], None, None]:
     """
-    Helper function to create a SearchSpace object from a block of 3 lines.
+    Yields the six integers of every block, (a_x, a_y, b_x, b_y, prize_x, prize_y), without building
+    SearchSpace objects. The file is memory-mapped and all blocks are matched by one compiled pattern,
+    so no line is copied or stripped on the way. Anything but whitespace between the blocks is an error.
 
-    :param block: A list containing 3 lines (Button A, Button B, Prize).
-    :return: A constructed SearchSpace object.
+    :param file_path: Path to the text file containing SearchSpace definitions.
+    :return: A generator of block tuples.
+    :raises ValueError: If the file holds a malformed block.
+    """
+    with open(file_path, 'rb') as file:
+        if os.fstat(file.fileno()).st_size == 0:
+            return  # an empty file can't be mapped
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            position = 0
+            for match in BLOCK_PATTERN.finditer(data):
+                _check_gap(data, position, match.start())
+                yield tuple(map(int, match.groups()))
+                position = match.end()
+            _check_gap(data, position, len(data))
+
+
+def _check_gap(data: mmap.mmap, start: int, end: int) -> None:
+    """Raises ValueError if there is anything but whitespace between two matched blocks, a block the pattern
+    skipped is malformed."""
+    gap = data[start:end]
+    if gap.strip():
+        raise ValueError(f"Invalid block at byte {start + len(gap) - len(gap.lstrip())}: {gap.strip()[:80]!r}")
+
+
+def _solve_block(search_space: SearchSpace, time_limit: float | None) -> tuple[int | None, bool]:
+    """Runs the search of one block in a worker, returns its cost and whether it timed out."""
+    try:
+        return search_space.bfs(time_limit), False
+    except TimeoutError:
+        return None, True
+
+
+def parallel_bfs(search_spaces: Iterable[SearchSpace], workers: int | None = None, max_in_flight: int | None = None,
+                 time_limit: float | None = None, cache: SolutionCache | None = None
+                 ) -> Generator[BlockResult, None, None]:
+    """
+    Runs the search of every SearchSpace in a process pool and yields the results in input order.
+
+    :param search_spaces: SearchSpaces to evaluate, they are consumed lazily.
+    :param workers: Number of worker processes, defaults to the number of CPUs.
+    :param max_in_flight: Maximum number of submitted but not yet yielded blocks, defaults to 4 per worker.
+        A slow block holds back only this many results, and so bounds the memory used.
+    :param time_limit: Seconds after which a block is given up and marked as timed out.
+    :param cache: Cache of solutions, blocks found in it are not submitted and new solutions are added to it.
+    :return: A generator of BlockResult, indexed from 1.
+    """
+    workers = workers or os.cpu_count() or 1
+    max_in_flight = max_in_flight or 4 * workers
+    in_flight: deque[tuple[int, tuple, Future]] = deque()
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for index, search_space in enumerate(search_spaces, start=1):
+            if len(in_flight) >= max_in_flight:
+                yield _collect_block(*in_flight.popleft(), cache)
+            key = ("bfs",) + search_space.normalized_key()
+            found, cost = cache.get(key) if cache is not None else (False, None)
+            if found:
+                # a cache hit takes its place in the ordered queue as an already finished block
+                future = Future()
+                future.set_result((cost, False))
+            else:
+                future = executor.submit(_solve_block, search_space, time_limit)
+            in_flight.append((index, key, future))
+        while in_flight:
+            yield _collect_block(*in_flight.popleft(), cache)
+
+
+def _collect_block(index: int, key: tuple, future: Future, cache: SolutionCache | None) -> BlockResult:
+    """Waits for the block submitted as index-th and caches its solution, unless it timed out."""
+    cost, timed_out = future.result()
+    if cache is not None and not timed_out:
+        cache.put(key, cost)
+    return BlockResult(index=index, cost=cost, timed_out=timed_out)
+
+
+def write_search_spaces(stream: TextIO, count: int, colinear_ratio: float = 0.0, reachable_ratio: float = 0.5,
+                        seed: int = 0) -> None:
     """
-    # Example block:
-    # Button A: X+94, Y+34
-    # Button B: X+22, Y+67
-    # Prize: X=8400, Y=5400
-
-    # Regex patterns to extract the coordinates from each line
-    button_pattern = re.compile(r"X\+(\d+), Y\+(\d+)")
-    prize_pattern = re.compile(r"X=(\d+), Y=(\d+)")
-
-    # Parse Button A
-    a_match = button_pattern.search(block[0])
-    a_x, a_y = map(int, a_match.groups())
-
-    # Parse Button B
-    b_match = button_pattern.search(block[1])
-    b_x, b_y = map(int, b_match.groups())
-
-    # Parse Prize
-    prize_match = prize_pattern.search(block[2])
-    prize_x, prize_y = map(int, prize_match.groups())
-
-    # Return the constructed SearchSpace
-    return SearchSpace(
-        target=Point2(prize_x, prize_y),
-        a_move=Point2(a_x, a_y),
-        b_move=Point2(b_x, b_y),
-    )
+    Writes random claw machine blocks in the format read by `parse_search_spaces`.
+
+    :param stream: Text stream to write the blocks to.
+    :param count: Number of blocks to write.
+    :param colinear_ratio: Fraction of machines whose buttons move along the same line.
+    :param reachable_ratio: Fraction of machines whose prize is placed on a combination of button moves,
+        the other prizes are shifted off it and are very likely unreachable.
+    :param seed: Seed of the random generator.
+    """
+    rng = random.Random(seed)
+    for _ in range(count):
+        if rng.random() < colinear_ratio:
+            direction = Point2(rng.randint(1, 9), rng.randint(1, 9))
+            max_multiple = 99 // max(direction)
+            a_move = direction * rng.randint(1, max_multiple)
+            b_move = direction * rng.randint(1, max_multiple)
+        else:
+            a_move = Point2(rng.randint(10, 99), rng.randint(10, 99))
+            b_move = Point2(rng.randint(10, 99), rng.randint(10, 99))
+        target = a_move * rng.randint(0, 100) + b_move * rng.randint(0, 100)
+        if rng.random() >= reachable_ratio:
+            target += Point2(rng.randint(1, 9), rng.randint(1, 9))
+        stream.write(f"Button A: X+{a_move.x}, Y+{a_move.y}\n"
+                     f"Button B: X+{b_move.x}, Y+{b_move.y}\n"
+                     f"Prize: X={target.x}, Y={target.y}\n\n")
+
+
+def generate(file_path: str, scale: int = 1, seed: int = 0) -> None:
+    """Writes 320 * scale claw machines, a few of them colinear, like the puzzle input."""
+    with open(file_path, "w") as file:
+        write_search_spaces(file, 320 * scale, colinear_ratio=0.02, seed=seed)
+
+
+def parse(file_path: str) -> list[SearchSpace]:
+    return list(parse_search_spaces(file_path))
+
+
+def solve(search_spaces: list[SearchSpace]) -> int:
+    """Total cost of all reachable targets."""
+    with SolutionCache() as cache:
+        results = [cache.solve(s, SearchSpace.bfs) for s in search_spaces]
+    return sum(result for result in results if result is not None)
+
 
 def main():
     """
     Main function to process input file, run DFS for each SearchSpace, and display the results.
     """
-    input_file = "base_input.txt"
+    input_file = INPUT_FILE
     total_cost = 0
 
-    # Parse the file using the generator
-    for index, search_space in enumerate(parse_search_spaces(input_file), start=1):
-        # Run DFS on the current SearchSpace
-        result = search_space.bfs()
-
+    # Parse the file using the generator and search the SearchSpaces in parallel, repeated machines only once
+    cache = SolutionCache()
+    for index, result, timed_out in parallel_bfs(parse_search_spaces(input_file), time_limit=BLOCK_TIME_LIMIT,
+                                                 cache=cache):
         # Check if the target was reachable
-        if result is not None:
+        if timed_out:
+            print(f"SearchSpace {index}: Search timed out")
+        elif result is not None:
             print(f"SearchSpace {index}: Target reached with cost {result}")
             total_cost += result  # Add the cost to the total cost
         else:
@@ -0,0 +1,78 @@
+"""
+Compares the claw machine solvers of extended.py on seeded random machines and prints a CSV table
+of the time per machine. 2-button machines are solved by the closed form fast path of
+`SearchSpace.numerical_solution` and by the general `solve_buttons`, machines with more buttons by
+`solve_buttons` only. Every set is solved at the puzzle sized targets and moved by the offset of the
+extended puzzle.
+
+Run from the year directory, so the shared modules are found:
+    PYTHONPATH=. python 13/bench_solvers.py
+"""
+import argparse
+import csv
+import random
+import sys
+import time
+from typing import Callable
+
+from extended import Point2, SearchSpace, solve_buttons
+
+PRICES = [3, 1, 2, 5]
+OFFSETS = (0, 10000000000000)
+
+
+def random_machines(count: int, buttons: int, seed: int = 0) -> list[tuple[list[Point2], Point2]]:
+    """Machines with button moves from 10 to 99 on each axis and a reachable target of up to 100 presses
+    of each button."""
+    rng = random.Random(seed)
+    machines = []
+    for _ in range(count):
+        moves = [Point2(rng.randint(10, 99), rng.randint(10, 99)) for _ in range(buttons)]
+        target = Point2(0, 0)
+        for move in moves:
+            target += move * rng.randint(0, 100)
+        machines.append((moves, target))
+    return machines
+
+
+def fast_path(moves: list[Point2], prices: list[int], target: Point2) -> int | None:
+    a_move, b_move = moves
+    return SearchSpace(target, a_move, b_move, *prices).numerical_solution()
+
+
+def time_solver(solver: Callable[[list[Point2], list[int], Point2], int | None],
+                machines: list[tuple[list[Point2], Point2]], offset: int) -> tuple[float, int]:
+    """Returns the seconds per machine and the total cost of the reachable targets."""
+    shift = Point2(offset, offset)
+    start = time.perf_counter()
+    total = 0
+    for moves, target in machines:
+        cost = solver(moves, PRICES[:len(moves)], target + shift)
+        if cost is not None:
+            total += cost
+    return (time.perf_counter() - start) / len(machines), total
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Times the claw machine solvers per number of buttons.")
+    parser.add_argument("--machines", type=int, default=200, help="machines per number of buttons")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the random machines")
+    args = parser.parse_args()
+
+    cases = [
+        ("numerical_solution", fast_path, 2),
+        ("solve_buttons", solve_buttons, 2),
+        ("solve_buttons", solve_buttons, 3),
+        ("solve_buttons", solve_buttons, 4),
+    ]
+    writer = csv.writer(sys.stdout)
+    writer.writerow(["solver", "buttons", "offset", "machines", "seconds_per_machine", "total_cost"])
+    for name, solver, buttons in cases:
+        machines = random_machines(args.machines, buttons, args.seed)
+        for offset in OFFSETS:
+            seconds, total = time_solver(solver, machines, offset)
+            writer.writerow([name, buttons, offset, len(machines), f"{seconds:.6f}", total])
+
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,21 @@
 import heapq
+import itertools
+import mmap
+import os
+from pathlib import Path
 from typing import NamedTuple, Generator
 import re
 import math
+from fractions import Fraction
 
+from solution_cache import SolutionCache
 
-def lcm(a, b):
-    return a * b // math.gcd(a, b)
+INPUT_FILE = Path(__file__).resolve().parent / "base_input.txt"
+
+BUTTON_PATTERN = re.compile(r"X\+(\d+), Y\+(\d+)")
+PRIZE_PATTERN = re.compile(r"X=(\d+), Y=(\d+)")
+# one claw machine block, whitespace between its lines is free so blank lines and \r\n endings are accepted
+BLOCK_PATTERN = re.compile(rb"Button A: X\+(\d+), Y\+(\d+)\s+Button B: X\+(\d+), Y\+(\d+)\s+Prize: X=(\d+), Y=(\d+)")
 
 
 class Point2(NamedTuple):
@@ -56,16 +66,27 @@ class SpacePosition(NamedTuple):
 
 class SearchSpace:
 
-    def __init__(self, target: Point2, a_move: Point2, b_move: Point2):
+    def __init__(self, target: Point2, a_move: Point2, b_move: Point2, a_price: int = 3, b_price: int = 1):
         self.target = target
         self.a_move = a_move
         self.b_move = b_move
-        self.a_price = 3
-        self.b_price = 1
+        self.a_price = a_price
+        self.b_price = b_price
 
     def move_target(self, move: Point2):
         self.target += move
 
+    def normalized_key(self) -> tuple[int, ...]:
+        """Returns the machine parameters with each axis divided by the gcd of its moves and target.
+        Button presses solve both axes independently of such scaling, so machines with equal keys
+        have equal solutions."""
+        x_gcd = math.gcd(self.a_move.x, self.b_move.x, self.target.x) or 1
+        y_gcd = math.gcd(self.a_move.y, self.b_move.y, self.target.y) or 1
+        return (self.a_move.x // x_gcd, self.a_move.y // y_gcd,
+                self.b_move.x // x_gcd, self.b_move.y // y_gcd,
+                self.target.x // x_gcd, self.target.y // y_gcd,
+                self.a_price, self.b_price)
+
     def bfs(self) -> int | None:
         return self._bfs(self.target)
 
@@ -94,7 +115,7 @@ class SearchSpace:
             for move, price in [(self.a_move, self.a_price), (self.b_move, self.b_price)]:
                 next_point = current.point + move
                 next_cost = current.cost + price
-                if (self.target - next_point).is_positive():  # didn't overshoot
+                if (actual_target - next_point).is_positive():  # didn't overshoot
                     heapq.heappush(priority_queue, SpacePosition(next_cost, next_point))
 
         return None  # Target unreachable
@@ -109,16 +130,8 @@ class SearchSpace:
             d_target = a.x * y - a.y * x
             if d_target != 0:
                 return None  # target doesn't lie on the same line, there is no solution
-            common_move = Point2(lcm(a.x, b.x), lcm(a.y, b.y))
-
-            common_a_moves = common_move.x // a.x
-            common_b_moves = common_move.x // b.x
-            common_move_price = min(common_a_moves * self.a_price, common_b_moves * self.b_price)
-            common_move_count = x // common_move.x
-            rest_price = self._bfs(self.target - common_move * common_move_count)
-            if rest_price is None: # there is no integral solution
-                return None
-            return common_move_count * common_move_price + rest_price
+            # colinear vectors, the solutions form a line of the integral lattice
+            return solve_buttons([a, b], [self.a_price, self.b_price], self.target)
 
         else:
             # vectors are independent, there is at most one integral solution
@@ -127,84 +140,376 @@ class SearchSpace:
             if a_num % d == 0 and b_num % d == 0:
                 a_moves = a_num // d
                 b_moves = b_num // d
+                if a_moves < 0 or b_moves < 0:
+                    return None  # the buttons can't be pressed a negative number of times
                 return a_moves * self.a_price + b_moves * self.b_price
             else:
                 return None
 
 
+class MultiButtonSearchSpace:
+    """Claw machine with any number of buttons, each with its own move and price."""
+
+    def __init__(self, target: Point2, moves: list[Point2], prices: list[int]):
+        if len(moves) != len(prices):
+            raise ValueError("Every button needs exactly one price.")
+        self.target = target
+        self.moves = moves
+        self.prices = prices
+
+    def move_target(self, move: Point2):
+        self.target += move
+
+    def normalized_key(self) -> tuple[int, ...]:
+        """Returns the machine parameters with each axis divided by the gcd of its moves and target,
+        machines with equal keys have equal solutions."""
+        x_gcd = math.gcd(self.target.x, *(m.x for m in self.moves)) or 1
+        y_gcd = math.gcd(self.target.y, *(m.y for m in self.moves)) or 1
+        return (self.target.x // x_gcd, self.target.y // y_gcd,
+                *(c for m in self.moves for c in (m.x // x_gcd, m.y // y_gcd)),
+                *self.prices)
+
+    def solution(self) -> int | None:
+        return solve_buttons(self.moves, self.prices, self.target)
+
+
+def solve_buttons(moves: list[Point2], prices: list[int], target: Point2) -> int | None:
+    """
+    Finds the cheapest way to reach the target exactly by pressing buttons with the given moves and prices.
+
+    All integral press counts reaching the target are n = n0 + t * k, where n0 is a particular solution and
+    k spans the kernel lattice of the move matrix, both read from its column echelon form. When the kernel
+    has dimension at most one, the press counts are non-negative on an interval of t and the cost, linear
+    in t, is minimal at one of its ends. Buttons beyond that are not needed to span the moves, so their press
+    counts are enumerated and the rest is solved as above. Some cheapest integral solution is within
+    N * D of a cheapest fractional one in every press count, where D is the largest absolute entry or 2x2
+    minor of the moves (Cook, Gerards, Schrijver and Tardos, 1986), so only press counts in that window
+    around the optimum of the linear relaxation are enumerated. Within it they are tried outwards from the
+    relaxed optimum until the relaxed cost of the rest can't beat the cheapest solution found.
+
+    Performance: with a kernel of dimension at most one (two buttons, or three buttons whose moves are not
+    colinear) the solver does O(N^3) big integer operations for N buttons, regardless of the size of the
+    target. Every further kernel dimension enumerates one more button over at most 2 * N * D + 1 press
+    counts, also regardless of the size of the target. Four buttons with moves below 100 take about 5 ms
+    per machine with 10^13 targets, against 3 us of the 2-button closed form, see bench_solvers.py.
+
+    :param moves: Move of each button, with non-negative coordinates and not (0, 0).
+    :param prices: Non-negative price of each button.
+    :param target: Position to reach.
+    :return: The lowest total price, or None if the target can't be reached.
+    """
+    if any(m.x < 0 or m.y < 0 or m.is_zero() for m in moves):
+        raise ValueError("Button moves must be non-negative and non-zero.")
+    if any(p < 0 for p in prices):
+        raise ValueError("Button prices must be non-negative.")
+    if not target.is_positive():
+        return None
+
+    press_bounds = [min(t // c for t, c in zip(target, m) if c > 0) for m in moves]
+    solved = list(range(len(moves)))
+    rank = _rank([moves[i] for i in solved])
+    enumerated = []
+    while len(solved) - rank > 1:
+        # some button isn't needed to span the moves, enumerate the one with the fewest possible presses
+        for i in sorted(solved, key=lambda i: press_bounds[i]):
+            rest = [j for j in solved if j != i]
+            if _rank([moves[j] for j in rest]) == rank:
+                solved = rest
+                enumerated.append(i)
+                break
+
+    lattice = _column_echelon([[moves[i].x for i in solved], [moves[i].y for i in solved]])
+    solved_prices = [prices[i] for i in solved]
+    if not enumerated:
+        return _cheapest_on_lattice(lattice, solved_prices, target)
+
+    relaxed = _relaxed_optimum(moves, prices, target)
+    if relaxed is None:
+        return None  # not even fractional presses reach the target
+    radius = len(moves) * _largest_minor(moves)
+    windows = [range(max(0, math.ceil(relaxed[1][i] - radius)),
+                     min(press_bounds[i], math.floor(relaxed[1][i] + radius)) + 1)
+               for i in enumerated]
+    best = None
+
+    def search(level: int, rest_target: Point2, spent: int) -> None:
+        """Tries the press counts of the level-th enumerated button, walking away from the optimum of the
+        relaxation in both directions. The relaxed cost is convex in the press count, so a direction ends
+        as soon as it can't beat the best solution found."""
+        nonlocal best
+        if level == len(enumerated):
+            cost = _cheapest_on_lattice(lattice, solved_prices, rest_target)
+            if cost is not None and (best is None or spent + cost < best):
+                best = spent + cost
+            return
+        button = enumerated[level]
+        free = enumerated[level + 1:] + solved
+        center = _relaxed_optimum([moves[i] for i in [button] + free], [prices[i] for i in [button] + free],
+                                  rest_target)
+        if center is None:
+            return
+        window = windows[level]
+        upwards = range(max(window.start, math.ceil(center[1][0])), window.stop)
+        downwards = range(min(window.stop, math.ceil(center[1][0])) - 1, window.start - 1, -1)
+        for presses in (upwards, downwards):
+            for count in presses:
+                next_target = rest_target - moves[button] * count
+                next_spent = spent + prices[button] * count
+                bound = _relaxed_optimum([moves[i] for i in free], [prices[i] for i in free], next_target)
+                if bound is None or (best is not None and next_spent + math.ceil(bound[0]) >= best):
+                    break
+                search(level + 1, next_target, next_spent)
+
+    search(0, target, 0)
+    return best
+
+
+def _cheapest_on_lattice(lattice: tuple[list[list[int]], list[list[int]], list[int]], prices: list[int],
+                         target: Point2) -> int | None:
+    """Cheapest non-negative press counts reaching target for buttons whose move matrix has the given
+    column echelon form, which must have a kernel of dimension at most one."""
+    echelon, transform, pivot_rows = lattice
+    buttons = len(transform)
+    rank = len(pivot_rows)
+
+    # solve the echelon system for the first rank coordinates, the rest are free
+    coordinates = []
+    for row, value in enumerate(target):
+        residual = value - sum(echelon[row][j] * coordinates[j] for j in range(len(coordinates)))
+        if row in pivot_rows:
+            pivot = echelon[row][len(coordinates)]
+            if residual % pivot != 0:
+                return None  # no integral solution
+            coordinates.append(residual // pivot)
+        elif residual != 0:
+            return None  # target is out of the span of the moves
+    presses = [sum(transform[i][j] * coordinates[j] for j in range(rank)) for i in range(buttons)]
+    cost = sum(p * n for p, n in zip(prices, presses))
+    if rank == buttons:
+        return cost if all(n >= 0 for n in presses) else None
+
+    # presses + t * kernel must stay non-negative, the moves are non-negative so this bounds t
+    kernel = [transform[i][rank] for i in range(buttons)]
+    low, high = None, None
+    for n, k in zip(presses, kernel):
+        if k > 0:
+            low = -(n // k) if low is None else max(low, -(n // k))
+        elif k < 0:
+            high = n // -k if high is None else min(high, n // -k)
+        elif n < 0:
+            return None
+    if low is None or high is None or low > high:
+        return None
+    slope = sum(p * k for p, k in zip(prices, kernel))
+    return cost + slope * (low if slope >= 0 else high)
+
+
+def _relaxed_optimum(moves: list[Point2], prices: list[int],
+                     target: Point2) -> tuple[Fraction, list[Fraction]] | None:
+    """Cost and press counts of the cheapest non-negative fractional presses reaching the target, or None if
+    there are none. The optimum is at a vertex, where only the buttons of a basis of the moves are pressed."""
+    bases = [(i, j) for i, j in itertools.combinations(range(len(moves)), 2)
+             if moves[i].x * moves[j].y != moves[i].y * moves[j].x]
+    if not bases:
+        # all moves are colinear, a basis is a single button
+        bases = [(i,) for i in range(len(moves))]
+    best, best_cost = None, None
+    for basis in bases:
+        presses = _basis_presses([moves[i] for i in basis], target)
+        if presses is None or any(n < 0 for n in presses):
+            continue
+        cost = sum(prices[i] * n for i, n in zip(basis, presses))
+        if best_cost is None or cost < best_cost:
+            best_cost = cost
+            best = [Fraction(0)] * len(moves)
+            for i, n in zip(basis, presses):
+                best[i] = n
+    return None if best is None else (best_cost, best)
+
+
+def _basis_presses(basis: list[Point2], target: Point2) -> list[Fraction] | None:
+    """Press counts of one or two independent moves reaching the target, None if it is out of their span."""
+    if len(basis) == 1:
+        move, = basis
+        if move.x * target.y != move.y * target.x:
+            return None
+        return [Fraction(target.x, move.x) if move.x else Fraction(target.y, move.y)]
+    a, b = basis
+    d = a.x * b.y - a.y * b.x
+    return [Fraction(target.x * b.y - target.y * b.x, d), Fraction(a.x * target.y - a.y * target.x, d)]
+
+
+def _largest_minor(moves: list[Point2]) -> int:
+    """Largest absolute value of a subdeterminant of the move matrix, at least 1."""
+    entries = [abs(c) for m in moves for c in m]
+    minors = [abs(a.x * b.y - a.y * b.x) for a, b in itertools.combinations(moves, 2)]
+    return max(1, *entries, *minors)
+
+
+def _rank(moves: list[Point2]) -> int:
+    if not moves:
+        return 0
+    return len(_column_echelon([[m.x for m in moves], [m.y for m in moves]])[2])
+
+
+def _column_echelon(matrix: list[list[int]]) -> tuple[list[list[int]], list[list[int]], list[int]]:
+    """
+    Brings an integral matrix to a lower column echelon form by unimodular column operations.
+
+    :param matrix: Matrix as a list of rows.
+    :return: Echelon form E, unimodular U with E = matrix * U and the pivot row of each of the first rank
+        columns of E. The remaining columns of E are zero, so the matching columns of U span its kernel.
+    """
+    columns = len(matrix[0])
+    echelon = [row[:] for row in matrix]
+    transform = [[int(i == j) for j in range(columns)] for i in range(columns)]
+
+    def add_column(target: int, source: int, factor: int) -> None:
+        for row in echelon + transform:
+            row[target] += factor * row[source]
+
+    def swap_columns(i: int, j: int) -> None:
+        for row in echelon + transform:
+            row[i], row[j] = row[j], row[i]
+
+    pivot_rows = []
+    for row in range(len(matrix)):
+        pivot = len(pivot_rows)
+        if pivot == columns:
+            break
+        # Euclid's algorithm on the columns leaves the gcd of the row in the pivot column
+        for column in range(pivot + 1, columns):
+            while echelon[row][column] != 0:
+                add_column(pivot, column, -(echelon[row][pivot] // echelon[row][column]))
+                swap_columns(pivot, column)
+        if echelon[row][pivot] != 0:
+            pivot_rows.append(row)
+    return echelon, transform, pivot_rows
+
+
 def parse_search_spaces(file_path: str) -> Generator[SearchSpace, None, None]:
     """
-    Parses a text file into a generator of SearchSpace objects as the file is read line by line.
+    Parses a text file into a generator of SearchSpace objects as the blocks are matched in the mapped file.
 
     :param file_path: Path to the text file containing SearchSpace definitions.
     :return: A generator that yields SearchSpace objects.
     """
-    # Use a buffer to accumulate lines of a single block (3 lines per block)
-    buffer = []
+    for a_x, a_y, b_x, b_y, prize_x, prize_y in iter_blocks(file_path):
+        yield SearchSpace(
+            target=Point2(prize_x, prize_y),
+            a_move=Point2(a_x, a_y),
+            b_move=Point2(b_x, b_y),
+        )
 
-    # Open the file and process it lazily
-    with open(file_path, 'r') as file:
-        for line in file:
-            line = line.strip()  # Remove whitespace (e.g., newlines)
-            if line:  # Add non-empty lines to the buffer
-                buffer.append(line)
 
-            # A block is complete when we have 3 lines (Button A, Button B, Prize)
-            if len(buffer) == 3:
-                # Process the block to create a SearchSpace object
-                yield _create_search_space_from_block(buffer)
-                buffer = []  # Clear the buffer for the next block
+def iter_blocks(file_path: str) -> Generator[tuple[int, int, int, int, int, int], None, None]:
+    """
+    Yields the six integers of every block, (a_x, a_y, b_x, b_y, prize_x, prize_y), without building
+    SearchSpace objects. The file is memory-mapped and all blocks are matched by one compiled pattern,
+    so no line is copied or stripped on the way. Anything but whitespace between the blocks is an error.
 
+    :param file_path: Path to the text file containing SearchSpace definitions.
+    :return: A generator of block tuples.
+    :raises ValueError: If the file holds a malformed block.
+    """
+    with open(file_path, 'rb') as file:
+        if os.fstat(file.fileno()).st_size == 0:
+            return  # an empty file can't be mapped
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            position = 0
+            for match in BLOCK_PATTERN.finditer(data):
+                _check_gap(data, position, match.start())
+                yield tuple(map(int, match.groups()))
+                position = match.end()
+            _check_gap(data, position, len(data))
+
+
+def _check_gap(data: mmap.mmap, start: int, end: int) -> None:
+    """Raises ValueError if there is anything but whitespace between two matched blocks, a block the pattern
+    skipped is malformed."""
+    gap = data[start:end]
+    if gap.strip():
+        raise ValueError(f"Invalid block at byte {start + len(gap) - len(gap.lstrip())}: {gap.strip()[:80]!r}")
+
+
+def total_cost(file_path: str, move: Point2 = Point2(0, 0), a_price: int = 3, b_price: int = 1) -> int:
+    """
+    Total cost of all reachable targets of a file, without building a SearchSpace for every block.
+    Independent buttons are solved in place, only the rare colinear machines go through SearchSpace.
 
-def _create_search_space_from_block(block: list) -> SearchSpace:
+    :param file_path: Path to the text file containing SearchSpace definitions.
+    :param move: Move of every target, as in `SearchSpace.move_target`.
+    :param a_price: Price of button A.
+    :param b_price: Price of button B.
+    :return: Sum of the costs of reachable targets.
     """
-    Helper function to create a SearchSpace object from a block of 3 lines.
+    total = 0
+    for a_x, a_y, b_x, b_y, x, y in iter_blocks(file_path):
+        x += move.x
+        y += move.y
+        d = a_x * b_y - a_y * b_x
+        if d == 0:
+            cost = SearchSpace(Point2(x, y), Point2(a_x, a_y), Point2(b_x, b_y), a_price, b_price).numerical_solution()
+            total += cost or 0
+            continue
+        a_num = x * b_y - y * b_x
+        b_num = y * a_x - x * a_y
+        if a_num % d == 0 and b_num % d == 0 and a_num // d >= 0 and b_num // d >= 0:
+            total += a_num // d * a_price + b_num // d * b_price
+    return total
+
 
-    :param block: A list containing 3 lines (Button A, Button B, Prize).
-    :return: A constructed SearchSpace object.
+def parse_multi_button_spaces(file_path: str, prices: list[int]) -> Generator[MultiButtonSearchSpace, None, None]:
     """
-    # Example block:
-    # Button A: X+94, Y+34
-    # Button B: X+22, Y+67
-    # Prize: X=8400, Y=5400
+    Parses a text file of claw machines with any number of buttons into a generator of MultiButtonSearchSpace.
+    Every block has a `Button <name>: X+<x>, Y+<y>` line per button, followed by a `Prize: X=<x>, Y=<y>` line.
 
-    # Regex patterns to extract the coordinates from each line
-    button_pattern = re.compile(r"X\+(\d+), Y\+(\d+)")
-    prize_pattern = re.compile(r"X=(\d+), Y=(\d+)")
+    :param file_path: Path to the text file containing the machine definitions.
+    :param prices: Price of each button, in the order of the buttons in a block.
+    :return: A generator that yields MultiButtonSearchSpace objects.
+    """
+    moves = []
+    with open(file_path, 'r') as file:
+        for line in file:
+            line = line.strip()
+            if line.startswith("Button"):
+                moves.append(Point2(*map(int, BUTTON_PATTERN.search(line).groups())))
+            elif line.startswith("Prize"):
+                target = Point2(*map(int, PRIZE_PATTERN.search(line).groups()))
+                yield MultiButtonSearchSpace(target, moves, prices[:len(moves)])
+                moves = []
 
-    # Parse Button A
-    a_match = button_pattern.search(block[0])
-    a_x, a_y = map(int, a_match.groups())
 
-    # Parse Button B
-    b_match = button_pattern.search(block[1])
-    b_x, b_y = map(int, b_match.groups())
+def parse(file_path: str) -> list[SearchSpace]:
+    return list(parse_search_spaces(file_path))
 
-    # Parse Prize
-    prize_match = prize_pattern.search(block[2])
-    prize_x, prize_y = map(int, prize_match.groups())
 
-    # Return the constructed SearchSpace
-    return SearchSpace(
-        target=Point2(prize_x, prize_y),
-        a_move=Point2(a_x, a_y),
-        b_move=Point2(b_x, b_y),
-    )
+def solve(search_spaces: list[SearchSpace]) -> int:
+    """Total cost of all reachable targets, moved for the advanced mode."""
+    total_cost = 0
+    with SolutionCache() as cache:
+        for search_space in search_spaces:
+            search_space.move_target(move=Point2(10000000000000, 10000000000000))
+            result = cache.solve(search_space, SearchSpace.numerical_solution)
+            if result is not None:
+                total_cost += result
+    return total_cost
 
 
 def main():
     """
     Main function to process input file, run DFS for each SearchSpace, and display the results.
     """
-    input_file = "base_input.txt"
+    input_file = INPUT_FILE
     total_cost = 0
+    cache = SolutionCache()
 
     # Parse the file using the generator
     for index, search_space in enumerate(parse_search_spaces(input_file), start=1):
         #  for advanced mode, move target by 10000000000000 in both axes
         search_space.move_target(move=Point2(10000000000000, 10000000000000))
-        # Run DFS on the current SearchSpace
-        result = search_space.numerical_solution()
+        # Solve the current SearchSpace, repeated machines only once
+        result = cache.solve(search_space, SearchSpace.numerical_solution)
 
         # Check if the target was reachable
         if result is not None:
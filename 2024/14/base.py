@@ -1,9 +1,16 @@
+import random
 import sys
+from collections import OrderedDict
 from dataclasses import dataclass
-from math import floor, ceil
-from typing import NamedTuple, Iterable
+from math import floor, ceil, lcm
+from typing import NamedTuple, Iterable, TextIO, Callable, Generator
 from math import prod
 
+# how many density grids Space keeps for repeated queries
+DENSITY_CACHE_SIZE = 128
+# robot counts 0-9 to characters of a text frame
+FRAME_DIGITS = bytes.maketrans(bytes(range(10)), b".123456789")
+
 
 class Point2(NamedTuple):
     x: int
@@ -78,14 +85,130 @@ class Space:
         self.width = width
         self.height = height
         self.robots = []
+        self._densities: OrderedDict[int, tuple[int, ...]] = OrderedDict()
 
     def add_robots(self, robots: Iterable[Robot]) -> None:
         self.robots.extend(robots)
+        self._forget_queries()
 
     def simulate(self, seconds: int) -> None:
         for robot in self.robots:
             robot.move_time(seconds)
             robot.roll_over_bounds(Point2(self.width, self.height))
+        self._forget_queries()
+
+    @property
+    def period(self) -> int:
+        """Seconds after which all robots are back at their positions, x repeats after width seconds
+        and y after height seconds."""
+        return lcm(self.width, self.height)
+
+    def positions_at(self, seconds: int) -> list[Point2]:
+        """Positions of the robots after seconds from the current state, computed as (p + v * t) mod bounds
+        without moving the robots."""
+        return list(map(Point2, *self._coordinates_at(seconds)))
+
+    def positions_at_times(self, times: Iterable[int]) -> Generator[tuple[int, list[Point2]], None, None]:
+        """Yields (seconds, positions) for every queried time, see `positions_at`."""
+        for seconds in times:
+            yield seconds, self.positions_at(seconds)
+
+    def density_at(self, seconds: int) -> tuple[int, ...]:
+        """Number of robots on every cell after seconds, flattened row by row (index y * width + x).
+        The last DENSITY_CACHE_SIZE grids are cached."""
+        key = seconds % self.period
+        if key in self._densities:
+            self._densities.move_to_end(key)
+            return self._densities[key]
+        counts = [0] * (self.width * self.height)
+        for x, y in zip(*self._coordinates_at(key)):
+            counts[y * self.width + x] += 1
+        density = tuple(counts)
+        self._densities[key] = density
+        if len(self._densities) > DENSITY_CACHE_SIZE:
+            self._densities.popitem(last=False)
+        return density
+
+    def first_time(self, predicate: Callable[[list[Point2]], bool], start: int = 0,
+                   stop: int | None = None) -> int | None:
+        """Returns the first time in [start, stop) when predicate holds for the robot positions, or None.
+        Positions repeat after `period`, so by default a single period from start is searched."""
+        if stop is None:
+            stop = start + self.period
+        xs, ys = self._axis_tables()
+        for seconds in range(start, stop):
+            if predicate(list(map(Point2, xs[seconds % self.width], ys[seconds % self.height]))):
+                return seconds
+        return None
+
+    def largest_cluster(self, seconds: int = 0) -> int:
+        """Size of the largest group of occupied cells after seconds, connected horizontally or vertically.
+        Components are joined by union-find over flat cell indices."""
+        return self._largest_cluster(*self._coordinates_at(seconds))
+
+    def _largest_cluster(self, xs: list[int], ys: list[int]) -> int:
+        parents = {y * self.width + x: y * self.width + x for x, y in zip(xs, ys)}
+
+        def find(cell: int) -> int:
+            while parents[cell] != cell:
+                parents[cell] = parents[parents[cell]]  # path halving
+                cell = parents[cell]
+            return cell
+
+        for cell in parents:
+            neighbours = (cell + self.width,) if (cell + 1) % self.width == 0 else (cell + 1, cell + self.width)
+            for neighbour in neighbours:
+                if neighbour in parents:
+                    parents[find(cell)] = find(neighbour)
+        sizes = {}
+        for cell in parents:
+            root = find(cell)
+            sizes[root] = sizes.get(root, 0) + 1
+        return max(sizes.values(), default=0)
+
+    def first_cluster_time(self, threshold: int, start: int = 0, stop: int | None = None) -> int | None:
+        """
+        Returns the first time in [start, stop) when some cluster of robots has at least threshold cells,
+        one period from start by default. Frames whose occupied cells have fewer than threshold - 1
+        neighbouring pairs can't hold such a cluster, and are skipped after a few big integer operations.
+
+        :param threshold: Minimal size of the cluster.
+        :param start: First time searched.
+        :param stop: Time where the search ends, not searched.
+        :return: The time found, or None.
+        """
+        if stop is None:
+            stop = start + self.period
+        xs, ys = self._axis_tables()
+        for seconds in range(start, stop):
+            frame_xs, frame_ys = xs[seconds % self.width], ys[seconds % self.height]
+            # one byte of 255 per cell, so every neighbouring pair adds 8 bits to the overlap
+            mask = int.from_bytes(self._occupancy_frame(frame_xs, frame_ys), "little")
+            pairs = ((mask & (mask >> 8)).bit_count() + (mask & (mask >> (8 * self.width))).bit_count()) // 8
+            if pairs >= threshold - 1 and self._largest_cluster(frame_xs, frame_ys) >= threshold:
+                return seconds
+        return None
+
+    def _coordinates_at(self, seconds: int) -> tuple[list[int], list[int]]:
+        """Robot x and y coordinates after seconds, (p + v * t) mod bounds."""
+        return ([(r.position.x + r.velocity.x * seconds) % self.width for r in self.robots],
+                [(r.position.y + r.velocity.y * seconds) % self.height for r in self.robots])
+
+    def _axis_tables(self) -> tuple[list[list[int]], list[list[int]]]:
+        """Robot x coordinates for every time modulo width and y coordinates for every time modulo height.
+        They take (width + height) * robots integers, so only scans over many times build them."""
+        return (self._axis_table([r.position.x for r in self.robots], [r.velocity.x for r in self.robots], self.width),
+                self._axis_table([r.position.y for r in self.robots], [r.velocity.y for r in self.robots], self.height))
+
+    @staticmethod
+    def _axis_table(positions: list[int], velocities: list[int], size: int) -> list[list[int]]:
+        table = [[p % size for p in positions]]
+        for _ in range(size - 1):
+            table.append([(p + v) % size for p, v in zip(table[-1], velocities)])
+        return table
+
+    def _forget_queries(self) -> None:
+        self._densities.clear()
 
     def partition_to_quadrants(self) -> list[Square]:
         target_width = self.width // 2
@@ -99,14 +222,46 @@ class Space:
 
     def print_robot_positions(self) -> None:
         for i, robot in enumerate(self.robots, start=1):
-            print(f"Robot {i}: Position={robot.positions}")
+            print(f"Robot {i}: Position={robot.position}")
 
     def ascii_art_positions(self) -> None:
-        grid = [[0 for _ in range(self.width)] for _ in range(self.height)]
-        for robot in self.robots:
-            grid[robot.positions.y % self.height][robot.positions.x % self.width] += 1
-        for row in reversed(grid):
-            print(''.join(str(cell) if cell > 0 else '.' for cell in row))
+        print(self.render_frame())
+
+    def render_frame(self, seconds: int = 0) -> str:
+        """Text picture of the robots after seconds, digits count the robots on a cell (9 for 9 or more)
+        and '.' marks an empty one. Rows go from the highest y down."""
+        frame = bytes(min(count, 9) for count in self.density_at(seconds)).translate(FRAME_DIGITS)
+        rows = [frame[y * self.width:(y + 1) * self.width] for y in range(self.height - 1, -1, -1)]
+        return b"\n".join(rows).decode()
+
+    def occupancy_frame(self, seconds: int = 0) -> bytearray:
+        """Grayscale frame after seconds with one byte per cell, row by row from y = 0: 255 where
+        a robot stands and 0 elsewhere."""
+        return self._occupancy_frame(*self._coordinates_at(seconds))
+
+    def _occupancy_frame(self, xs: list[int], ys: list[int]) -> bytearray:
+        frame = bytearray(self.width * self.height)
+        for x, y in zip(xs, ys):
+            frame[y * self.width + x] = 255
+        return frame
+
+    def write_frame_stack(self, file_path: str, times: Iterable[int] | None = None) -> None:
+        """
+        Writes occupancy frames as a stack of binary PGM images into one file, one period by default.
+        Every frame is a complete image, and `<file_path>.index` lists `seconds offset` of each frame
+        so it can be read back by `read_stack_frame` without scanning the stack.
+
+        :param file_path: Path of the stack file.
+        :param times: Times of the frames, in the order they are written.
+        """
+        header = f"P5\n{self.width} {self.height}\n255\n".encode()
+        offset = 0
+        with open(file_path, "wb") as stack, open(file_path + ".index", "w") as index:
+            for seconds in (range(self.period) if times is None else times):
+                stack.write(header)
+                stack.write(self.occupancy_frame(seconds))
+                index.write(f"{seconds} {offset}\n")
+                offset += len(header) + self.width * self.height
 
     def count_robots_in_quadrants(self):
         squares = self.partition_to_quadrants()
@@ -143,6 +298,121 @@ def parse_robots_file(file_path: str) -> list[Robot]:
     return robots
 
 
+class SpaceBatch:
+    """
+    Many independent spaces simulated in lockstep. Robots of all spaces are packed into shared coordinate
+    lists with the bounds and the index of their space alongside, so moving every robot of every space is
+    one comprehension per axis instead of method calls on a Robot object per robot.
+    """
+
+    def __init__(self):
+        self.sizes: list[Point2] = []
+        self.xs: list[int] = []
+        self.ys: list[int] = []
+        self.velocities_x: list[int] = []
+        self.velocities_y: list[int] = []
+        self.widths: list[int] = []
+        self.heights: list[int] = []
+        self.space_indices: list[int] = []
+
+    def add_space(self, width: int, height: int, robots: Iterable[Robot]) -> int:
+        """Adds a space of width x height with robots, returns the index of the space in the batch."""
+        index = len(self.sizes)
+        self.sizes.append(Point2(width, height))
+        for robot in robots:
+            self.xs.append(robot.position.x % width)
+            self.ys.append(robot.position.y % height)
+            self.velocities_x.append(robot.velocity.x)
+            self.velocities_y.append(robot.velocity.y)
+            self.widths.append(width)
+            self.heights.append(height)
+            self.space_indices.append(index)
+        return index
+
+    def jump(self, seconds: int | list[int]) -> None:
+        """Moves all robots by seconds, either the same for every space or one value per space."""
+        if isinstance(seconds, int):
+            self.xs = [(x + v * seconds) % w for x, v, w in zip(self.xs, self.velocities_x, self.widths)]
+            self.ys = [(y + v * seconds) % h for y, v, h in zip(self.ys, self.velocities_y, self.heights)]
+        else:
+            if len(seconds) != len(self.sizes):
+                raise ValueError(f"Expected seconds for {len(self.sizes)} spaces, got {len(seconds)}")
+            robot_seconds = [seconds[i] for i in self.space_indices]
+            self.xs = [(x + v * t) % w for x, v, t, w in zip(self.xs, self.velocities_x, robot_seconds, self.widths)]
+            self.ys = [(y + v * t) % h for y, v, t, h in zip(self.ys, self.velocities_y, robot_seconds, self.heights)]
+
+    def step(self) -> None:
+        self.jump(1)
+
+    def quadrant_counts(self) -> list[list[int]]:
+        """Robot counts in the quadrants of every space, in the order of `Space.partition_to_quadrants`.
+        Robots on a middle row or column belong to no quadrant."""
+        counts = [0] * (4 * len(self.sizes))
+        for x, y, w, h, i in zip(self.xs, self.ys, self.widths, self.heights, self.space_indices):
+            if w - 1 == 2 * x or h - 1 == 2 * y:
+                continue  # on the middle column or row of an odd sized space
+            counts[4 * i + 2 * (2 * y >= h) + (2 * x >= w)] += 1
+        return [counts[i:i + 4] for i in range(0, len(counts), 4)]
+
+    def safety_factors(self) -> list[int]:
+        return [prod(counts) for counts in self.quadrant_counts()]
+
+
+def read_stack_frame(file_path: str, seconds: int) -> bytes:
+    """Returns the PGM image of the frame at seconds from a stack written by `Space.write_frame_stack`."""
+    with open(file_path + ".index") as index:
+        offsets = dict(map(int, line.split()) for line in index)
+    if seconds not in offsets:
+        raise KeyError(f"No frame at {seconds} seconds in {file_path}")
+    with open(file_path, "rb") as stack:
+        stack.seek(offsets[seconds])
+        # P5 header is three whitespace separated lines
+        header = b"".join(stack.readline() for _ in range(3))
+        width, height = map(int, header.split()[1:3])
+        return header + stack.read(width * height)
+
+
+def write_robots(stream: TextIO, count: int, width: int = 101, height: int = 103, max_speed: int = 100,
+                 seed: int = 0) -> None:
+    """Writes count random robots inside width x height bounds in the format read by `parse_robots_file`.
+    Velocity components are drawn from [-max_speed, max_speed]."""
+    rng = random.Random(seed)
+    for _ in range(count):
+        stream.write(f"p={rng.randrange(width)},{rng.randrange(height)} "
+                     f"v={rng.randint(-max_speed, max_speed)},{rng.randint(-max_speed, max_speed)}\n")
+
+
+def generate(file_path: str, scale: int = 1, seed: int = 0) -> None:
+    """Writes 500 * scale robots in the 101 x 103 space, like the puzzle input."""
+    with open(file_path, "w") as file:
+        write_robots(file, 500 * scale, seed=seed)
+
+
+def parse(file_path: str) -> list[Robot]:
+    return parse_robots_file(file_path)
+
+
+# example and puzzle input spaces, smallest first
+SPACE_SIZES = (Point2(11, 7), Point2(101, 103))
+
+
+def space_size(robots: list[Robot]) -> Point2:
+    """Bounds of the space the robots move in. The puzzle states them outside of the input file, 11 x 7
+    for the example and 101 x 103 for the real input, so the smallest one holding all start positions is taken."""
+    for size in SPACE_SIZES:
+        if all(0 <= r.position.x < size.x and 0 <= r.position.y < size.y for r in robots):
+            return size
+    return SPACE_SIZES[-1]
+
+
+def solve(robots: list[Robot]) -> int:
+    size = space_size(robots)
+    space = Space(width=size.x, height=size.y)
+    space.add_robots(robots)
+    space.simulate(seconds=100)
+    return prod(space.count_robots_in_quadrants())
+
+
 def main():
     input_file = "base_input.txt"
     robots = parse_robots_file(input_file)
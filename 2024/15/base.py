@@ -1,8 +1,15 @@
 import abc
+import random
 from dataclasses import dataclass
 from enum import Enum
+from math import isqrt
+from pathlib import Path
 from typing import NamedTuple, IO, TextIO, Iterable
 
+from grid import DIRECTIONS, PaddedGrid
+
+INPUT_FILE = Path(__file__).resolve().parent / "base_input.txt"
+
 
 class Point2(NamedTuple):
     x: int
@@ -49,22 +56,30 @@ class Point2(NamedTuple):
         return self.x == 0 and self.y == 0
 
 
+# cell bytes of WarehouseBatch boards
+EMPTY_CELL = ord(".")
+BOX_CELL = ord("O")
+ROBOT_CELL = ord("@")
+
+# orientation characters to direction names of the grid module
+ORIENTATION_DIRECTIONS = {"^": "N", "v": "S", "<": "W", ">": "E"}
+
+
 class Orientation(Enum):
     UP = "^"
     DOWN = "v"
     LEFT = "<"
     RIGHT = ">"
 
+    @property
+    def direction(self) -> str:
+        """Name of the direction in the grid module."""
+        return ORIENTATION_DIRECTIONS[self.value]
+
     def move(self, point: Point2) -> Point2:
         """Moves a Point2 one step in the direction of the Orientation."""
-        if self == Orientation.UP:
-            return point + Point2(0, -1)
-        elif self == Orientation.DOWN:
-            return point + Point2(0, 1)
-        elif self == Orientation.LEFT:
-            return point + Point2(-1, 0)
-        elif self == Orientation.RIGHT:
-            return point + Point2(1, 0)
+        dx, dy = DIRECTIONS[self.direction]
+        return Point2(point.x + dx, point.y + dy)
 
     @classmethod
     def from_char(cls, char: str) -> "Orientation":
@@ -80,30 +95,36 @@ class Item:
     position: Point2
 
     @abc.abstractmethod
-    def move(self, orientation: Orientation, board: "dict[Point2, Item]") -> Point2 | None:
+    def move(self, orientation: Orientation, board: "dict[Point2, Item]",
+             moved: "list[Item] | None" = None) -> Point2 | None:
         """Moves this item in the selected orientation.
         Tries to push an obstacle if it is there.
-        Returns none if immovable (either itself or blocked)"""
+        Returns none if immovable (either itself or blocked)
+        Every item that moved is appended to moved, if given."""
         pass
 
 
 @dataclass
 class MovableItem(Item):
 
-    def move(self, orientation: Orientation, board: "dict[Point2, Item]") -> Point2 | None:
+    def move(self, orientation: Orientation, board: "dict[Point2, Item]",
+             moved: "list[Item] | None" = None) -> Point2 | None:
         new_position = orientation.move(self.position)
         if new_position in board:
-            move_attempt = board[new_position].move(orientation, board)
+            move_attempt = board[new_position].move(orientation, board, moved)
             if move_attempt is None:
                 return None
         del board[self.position]
         self.position = new_position
         board[new_position] = self
+        if moved is not None:
+            moved.append(self)
         return new_position
 
 class Wall(Item):
 
-    def move(self, orientation: Orientation, board: "dict[Point2, Item]") -> Point2 | None:
+    def move(self, orientation: Orientation, board: "dict[Point2, Item]",
+             moved: "list[Item] | None" = None) -> Point2 | None:
         return None
 
     def __repr__(self):
@@ -134,6 +155,8 @@ class Warehouse:
         self.robot = robot
         self.width = width
         self.height = height
+        # GPS total of the boxes, updated by every push so value() doesn't re-sum them
+        self.gps_total = sum(b.value(Point2(width, height)) for b in boxes)
 
     @staticmethod
     def load(input_stream: TextIO) -> "Warehouse":
@@ -167,11 +190,22 @@ class Warehouse:
 
     def advance(self, orientation: Orientation) -> None:
         """Advance the simulation by one step."""
-        self.robot.move(orientation, self.items)
+        moved: list[Item] = []
+        self.robot.move(orientation, self.items, moved)
+        # every pushed box moves by one step, which changes its GPS coordinate by the same delta
+        step = orientation.move(Point2(0, 0))
+        self.gps_total += (step.x + 100 * step.y) * sum(1 for item in moved if isinstance(item, Box))
 
     def value(self) -> int:
-        size = Point2(self.width, self.height)
-        return sum(b.value(size) for b in self.boxes)
+        return self.gps_total
+
+    def score_trace(self, instructions: Iterable[Orientation]) -> list[int]:
+        """Advances by all instructions, returns the value after each step."""
+        trace = []
+        for orientation in instructions:
+            self.advance(orientation)
+            trace.append(self.gps_total)
+        return trace
 
 
     def __repr__(self):
@@ -187,8 +221,113 @@ class Warehouse:
         return self.__repr__()
 
 
+class WarehouseBatch:
+    """
+    Many warehouses advanced in lockstep by one shared instruction stream. Every board is stored as a flat
+    grid of its characters in one shared bytearray, so a step of a board is a few byte reads and writes
+    instead of dict updates of Item objects. Boards are padded with a wall border, so no move leaves its board.
+    """
+
+    def __init__(self, warehouses: Iterable[Warehouse]):
+        self.cells = bytearray()
+        self.offsets: list[int] = []
+        self.widths: list[int] = []
+        self.robots: list[int] = []
+        # flat index steps of every orientation on each board
+        self.steps: dict[Orientation, list[int]] = {orientation: [] for orientation in Orientation}
+        for warehouse in warehouses:
+            grid = PaddedGrid(repr(warehouse).split("\n"))
+            offset = len(self.cells)
+            self.cells += grid.cells
+            self.offsets.append(offset)
+            self.widths.append(grid.stride)
+            self.robots.append(offset + grid.find(ROBOT_CELL))
+            for orientation in Orientation:
+                self.steps[orientation].append(grid.offsets[orientation.direction])
+
+    def advance(self, orientation: Orientation) -> None:
+        """Advances the robots of all boards by one step."""
+        cells = self.cells
+        robots = self.robots
+        for i, step in enumerate(self.steps[orientation]):
+            robot = robots[i]
+            ahead = robot + step
+            end = ahead
+            while cells[end] == BOX_CELL:
+                end += step
+            if cells[end] == EMPTY_CELL:
+                # the row of boxes shifts by one, which is the same as moving its first box behind the last
+                cells[end] = cells[ahead]
+                cells[ahead] = ROBOT_CELL
+                cells[robot] = EMPTY_CELL
+                robots[i] = ahead
+
+    def run(self, instructions: Iterable[Orientation]) -> list[int]:
+        """Advances by all instructions, returns the final value of every board."""
+        for orientation in instructions:
+            self.advance(orientation)
+        return self.values()
+
+    def values(self) -> list[int]:
+        """GPS totals of the boxes of every board."""
+        values = []
+        for offset, width, end in zip(self.offsets, self.widths, self.offsets[1:] + [len(self.cells)]):
+            total = 0
+            index = self.cells.find(BOX_CELL, offset, end)
+            while index != -1:
+                # coordinates inside the border of the padded board
+                y, x = divmod(index - offset - width - 1, width)
+                total += x + 100 * y
+                index = self.cells.find(BOX_CELL, index + 1, end)
+            values.append(total)
+        return values
+
+
+def write_warehouse(stream: TextIO, width: int, height: int, box_density: float = 0.25, wall_density: float = 0.08,
+                    instruction_count: int = 20000, line_length: int = 1000, seed: int = 0) -> None:
+    """Writes a random warehouse surrounded by walls, followed by an empty line and instruction_count
+    random instructions in lines of line_length, in the format read by `Warehouse.load`.
+    Every inner cell is a wall or a box with the given densities, the robot takes a random inner cell."""
+    if width < 3 or height < 3:
+        raise ValueError("Warehouse needs at least one inner cell.")
+    rng = random.Random(seed)
+    robot_x = rng.randrange(1, width - 1)
+    robot_y = rng.randrange(1, height - 1)
+    cum_weights = (wall_density, wall_density + box_density, 1.0)
+    stream.write("#" * width + "\n")
+    for y in range(1, height - 1):
+        row = rng.choices("#O.", cum_weights=cum_weights, k=width - 2)
+        if y == robot_y:
+            row[robot_x - 1] = "@"
+        stream.write("#" + "".join(row) + "#\n")
+    stream.write("#" * width + "\n\n")
+    for start in range(0, instruction_count, line_length):
+        stream.write("".join(rng.choices("^v<>", k=min(line_length, instruction_count - start))) + "\n")
+
+
+def generate(file_name: str, scale: int = 1, seed: int = 0) -> None:
+    """Writes a warehouse with scale times the cells and instructions of the 50 x 50 puzzle input."""
+    size = isqrt(2500 * scale)
+    with open(file_name, "w") as file:
+        write_warehouse(file, size, size, instruction_count=20000 * scale, seed=seed)
+
+
+def parse(file_name: str) -> tuple[Warehouse, list[Orientation]]:
+    """Loads the warehouse and the instructions following it."""
+    with open(file_name, "r") as file:
+        warehouse = Warehouse.load(file)
+        instructions = [Orientation.from_char(char) for char in file.read() if char.strip()]
+    return warehouse, instructions
+
+
+def solve(puzzle: tuple[Warehouse, list[Orientation]]) -> int:
+    """Final value of the warehouse, advanced on the flat padded board of a one board WarehouseBatch."""
+    warehouse, instructions = puzzle
+    return WarehouseBatch([warehouse]).run(instructions)[0]
+
+
 if __name__ == "__main__":
-    with open("base_input.txt", "r") as file:
+    with open(INPUT_FILE, "r") as file:
         warehouse = Warehouse.load(file)
 
         for char in file.read():
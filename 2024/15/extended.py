@@ -2,9 +2,14 @@ import abc
 from collections import deque
 from dataclasses import dataclass
 from enum import Enum
+from pathlib import Path
 from types import new_class
 from typing import NamedTuple, IO, TextIO, Iterable
 
+from grid import DIRECTIONS, PaddedGrid
+
+INPUT_FILE = Path(__file__).resolve().parent / "base_input.txt"
+
 
 class Point2(NamedTuple):
     x: int
@@ -51,22 +56,32 @@ class Point2(NamedTuple):
         return self.x == 0 and self.y == 0
 
 
+# cell bytes of WarehouseBatch boards
+EMPTY_CELL = ord(".")
+WALL_CELL = ord("#")
+BOX_LEFT_CELL = ord("[")
+BOX_RIGHT_CELL = ord("]")
+ROBOT_CELL = ord("@")
+
+# orientation characters to direction names of the grid module
+ORIENTATION_DIRECTIONS = {"^": "N", "v": "S", "<": "W", ">": "E"}
+
+
 class Orientation(Enum):
     UP = "^"
     DOWN = "v"
     LEFT = "<"
     RIGHT = ">"
 
+    @property
+    def direction(self) -> str:
+        """Name of the direction in the grid module."""
+        return ORIENTATION_DIRECTIONS[self.value]
+
     def move(self, point: Point2) -> Point2:
         """Moves a Point2 one step in the direction of the Orientation."""
-        if self == Orientation.UP:
-            return point + Point2(0, -1)
-        elif self == Orientation.DOWN:
-            return point + Point2(0, 1)
-        elif self == Orientation.LEFT:
-            return point + Point2(-1, 0)
-        elif self == Orientation.RIGHT:
-            return point + Point2(1, 0)
+        dx, dy = DIRECTIONS[self.direction]
+        return Point2(point.x + dx, point.y + dy)
 
     def move_all(self, points: Iterable[Point2]) -> frozenset[Point2]:
         return frozenset(self.move(p) for p in points)
@@ -148,6 +163,8 @@ class Warehouse:
         self.robot = robot
         self.width = width
         self.height = height
+        # GPS total of the boxes, updated by every push so value() doesn't re-sum them
+        self.gps_total = sum(b.value(Point2(width, height)) for b in boxes)
 
     @staticmethod
     def load(input_stream: TextIO) -> "Warehouse":
@@ -193,8 +210,15 @@ class Warehouse:
 
 
     def value(self) -> int:
-        size = Point2(self.width, self.height)
-        return sum(b.value(size) for b in self.boxes)
+        return self.gps_total
+
+    def score_trace(self, instructions: Iterable[Orientation]) -> list[int]:
+        """Advances by all instructions, returns the value after each step."""
+        trace = []
+        for orientation in instructions:
+            self.advance(orientation)
+            trace.append(self.gps_total)
+        return trace
 
     def can_push_item(self, pos: Point2, orientation: Orientation) -> list[Item] | None:
         """If an item on position can be pushed, return the list of affected other (movable) items.
@@ -223,7 +247,12 @@ class Warehouse:
 
     def push_items(self, items: Iterable[Item], orientation: Orientation) -> None:
         """Push a list of items in the selected orientation."""
+        # a pushed box moves by one step, which changes its GPS coordinate by the same delta
+        step = orientation.move(Point2(0, 0))
+        delta = step.x + 100 * step.y
         for item in items:
+            if isinstance(item, Box):
+                self.gps_total += delta
             new_position = orientation.move_all(item.positions)
             for p in item.positions:
                 assert p in self.items
@@ -250,8 +279,110 @@ class Warehouse:
         return self.__repr__()
 
 
+class WarehouseBatch:
+    """
+    Many warehouses advanced in lockstep by one shared instruction stream. Every board is stored as a flat
+    grid of its characters in one shared bytearray, so a step of a board is a few byte reads and writes
+    instead of dict updates of Item objects. Boards are padded with a wall border, so no move leaves its board.
+    """
+
+    def __init__(self, warehouses: Iterable[Warehouse]):
+        self.cells = bytearray()
+        self.offsets: list[int] = []
+        self.widths: list[int] = []
+        self.robots: list[int] = []
+        # flat index steps of every orientation on each board
+        self.steps: dict[Orientation, list[int]] = {orientation: [] for orientation in Orientation}
+        for warehouse in warehouses:
+            grid = PaddedGrid(repr(warehouse).split("\n"))
+            offset = len(self.cells)
+            self.cells += grid.cells
+            self.offsets.append(offset)
+            self.widths.append(grid.stride)
+            self.robots.append(offset + grid.find(ROBOT_CELL))
+            for orientation in Orientation:
+                self.steps[orientation].append(grid.offsets[orientation.direction])
+
+    def advance(self, orientation: Orientation) -> None:
+        """Advances the robots of all boards by one step."""
+        vertical = orientation in (Orientation.UP, Orientation.DOWN)
+        cells = self.cells
+        robots = self.robots
+        for i, step in enumerate(self.steps[orientation]):
+            robot = robots[i]
+            ahead = robot + step
+            if cells[ahead] == EMPTY_CELL:
+                cells[ahead] = ROBOT_CELL
+                cells[robot] = EMPTY_CELL
+                robots[i] = ahead
+            elif cells[ahead] != WALL_CELL and self._push(robot, step, vertical):
+                robots[i] = ahead
+
+    def _push(self, robot: int, step: int, vertical: bool) -> bool:
+        """Moves the robot and all boxes it pushes by step, unless something hits a wall.
+        Cells to move are collected row by row (or cell by cell horizontally) and moved farthest first."""
+        cells = self.cells
+        moving: list[int] = []
+        frontier = {robot}
+        while frontier:
+            next_frontier = set()
+            for cell in frontier:
+                ahead = cell + step
+                content = cells[ahead]
+                if content == WALL_CELL:
+                    return False
+                if content == BOX_LEFT_CELL:
+                    next_frontier.add(ahead)
+                    if vertical:
+                        next_frontier.add(ahead + 1)
+                elif content == BOX_RIGHT_CELL:
+                    next_frontier.add(ahead)
+                    if vertical:
+                        next_frontier.add(ahead - 1)
+            moving.extend(frontier)
+            frontier = next_frontier
+        for cell in reversed(moving):
+            cells[cell + step] = cells[cell]
+            cells[cell] = EMPTY_CELL
+        return True
+
+    def run(self, instructions: Iterable[Orientation]) -> list[int]:
+        """Advances by all instructions, returns the final value of every board."""
+        for orientation in instructions:
+            self.advance(orientation)
+        return self.values()
+
+    def values(self) -> list[int]:
+        """GPS totals of the boxes of every board, measured from their left halves."""
+        values = []
+        for offset, width, end in zip(self.offsets, self.widths, self.offsets[1:] + [len(self.cells)]):
+            total = 0
+            index = self.cells.find(BOX_LEFT_CELL, offset, end)
+            while index != -1:
+                # coordinates inside the border of the padded board
+                y, x = divmod(index - offset - width - 1, width)
+                total += x + 100 * y
+                index = self.cells.find(BOX_LEFT_CELL, index + 1, end)
+            values.append(total)
+        return values
+
+
+def parse(file_name: str) -> tuple[Warehouse, list[Orientation]]:
+    """Loads the warehouse and the instructions following it."""
+    with open(file_name, "r") as file:
+        warehouse = Warehouse.load(file)
+        instructions = [Orientation.from_char(char) for char in file.read() if char.strip()]
+    return warehouse, instructions
+
+
+def solve(puzzle: tuple[Warehouse, list[Orientation]]) -> int:
+    """Final value of the warehouse, advanced on the flat padded board of a one board WarehouseBatch."""
+    warehouse, instructions = puzzle
+    return WarehouseBatch([warehouse]).run(instructions)[0]
+
+
 if __name__ == "__main__":
-    with open("base_input.txt", "r") as file:
+    with open(INPUT_FILE, "r") as file:
         warehouse = Warehouse.load(file)
         # print(warehouse)
         step = 1
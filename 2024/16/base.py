@@ -1,78 +1,525 @@
 import heapq
+from collections import deque
+from pathlib import Path
+from typing import NamedTuple
 
-def parse_maze(maze_input):
-    maze = [list(row) for row in maze_input.split("\n")]
-    start = None
-    end = None
+from grid import CARDINALS, WALL, PaddedGrid
 
-    for r, row in enumerate(maze):
-        for c, cell in enumerate(row):
-            if cell == 'S':
-                start = (r, c)
-            elif cell == 'E':
-                end = (r, c)
+INPUT_FILE = Path(__file__).resolve().parent / "base_input.txt"
 
-    return maze, start, end
+# largest edge cost solved by the bucket queue, the queue keeps this many buckets
+BUCKET_LIMIT = 4096
 
-def reindeer_maze_solver(maze_input):
-    maze, start, end = parse_maze(maze_input)
-
-    # Directions: (row_delta, col_delta, name)
-    directions = [
-        (-1, 0, 'N'),
-        (0, 1, 'E'),
-        (1, 0, 'S'),
-        (0, -1, 'W')
-    ]
-
-    # Map direction names to indices for rotation
-    direction_map = {d[2]: i for i, d in enumerate(directions)}
 
-    def heuristic(pos):
-        """Manhattan distance heuristic."""
-        return abs(pos[0] - end[0]) + abs(pos[1] - end[1])
+def reindeer_maze_solver(maze_input):
+    grid = PaddedGrid.from_text(maze_input)
+    cells = grid.cells
+    start = grid.find(ord('S'))
+    end = grid.find(ord('E'))
 
-    def is_valid_position(r, c):
-        return 0 <= r < len(maze) and 0 <= c < len(maze[0]) and maze[r][c] != '#'
+    # Flat index offsets of N, E, S, W, the wall border keeps every move inside the grid
+    directions = [grid.offsets[name] for name in CARDINALS]
+    east = CARDINALS.index('E')
 
-    # Priority queue for A*
+    # Priority queue for Dijkstra
     pq = []
-    # State: (total_score, current_position, current_direction)
-    heapq.heappush(pq, (0, start, 'E'))
+    # State: (total_score, cell index, direction index)
+    heapq.heappush(pq, (0, start, east))
 
-    # Visited states: (row, col, direction)
-    visited = set()
+    # Visited states: cell index * 4 + direction index
+    visited = bytearray(len(cells) * 4)
 
     while pq:
-        score, (r, c), direction = heapq.heappop(pq)
+        score, cell, direction = heapq.heappop(pq)
 
         # If we've reached the end, return the score
-        if (r, c) == end:
+        if cell == end:
             return score
 
-        if (r, c, direction) in visited:
+        if visited[cell * 4 + direction]:
             continue
 
-        visited.add((r, c, direction))
-
-        # Explore all possible moves
-        current_dir_idx = direction_map[direction]
+        visited[cell * 4 + direction] = 1
 
         # 1. Move forward
-        dr, dc, _ = directions[current_dir_idx]
-        nr, nc = r + dr, c + dc
-        if is_valid_position(nr, nc):
-            heapq.heappush(pq, (score + 1, (nr, nc), direction))
+        ahead = cell + directions[direction]
+        if cells[ahead] != WALL:
+            heapq.heappush(pq, (score + 1, ahead, direction))
 
         # 2. Turn clockwise or counterclockwise
-        for turn_cost, new_dir_idx in [(1000, (current_dir_idx + 1) % 4), (1000, (current_dir_idx - 1) % 4)]:
-            new_direction = directions[new_dir_idx][2]
-            heapq.heappush(pq, (score + turn_cost, (r, c), new_direction))
+        for new_direction in ((direction + 1) % 4, (direction - 1) % 4):
+            heapq.heappush(pq, (score + 1000, cell, new_direction))
 
     return float('inf')  # If no path is found
 
+
+class CostModel(NamedTuple):
+    """
+    Costs of the reindeer moves. Turns rotate by one heading, 90 degrees, or 45 degrees when diagonal
+    moves are allowed. A 180 degree turn in one move costs reverse, if set. Entering a tile costs its
+    tile_weights entry on top of the move, tiles not listed cost nothing extra.
+    """
+    forward: int = 1
+    turn: int = 1000
+    reverse: int | None = None
+    diagonal: int | None = None
+    tile_weights: dict[str, int] | None = None
+
+
+DEFAULT_COST_MODEL = CostModel()
+
+
+class MazeGraph:
+    """
+    (cell, heading) states of a maze padded with a wall border, with moves priced by a cost model. A state
+    is its flat cell index times the number of headings plus the heading index. Headings go clockwise from
+    north, the reindeer starts facing east. Diagonal moves only need the target cell to be open.
+    """
+
+    def __init__(self, maze_input, cost_model=DEFAULT_COST_MODEL):
+        grid = PaddedGrid.from_text(maze_input)
+        self.cost_model = cost_model
+        self.width = grid.stride
+        self.cells = grid.cells
+        if cost_model.diagonal is None:
+            self.headings = 4
+            self.steps = tuple(grid.offsets[name] for name in CARDINALS)
+        else:
+            self.headings = 8
+            self.steps = tuple(grid.offsets.values())
+        weights = {ord(tile): cost for tile, cost in (cost_model.tile_weights or {}).items()}
+        # cost of entering each cell by a straight and by a diagonal move, None for walls
+        self.enter_costs = [None if cell == WALL else cost_model.forward + weights.get(cell, 0)
+                            for cell in self.cells]
+        self.diagonal_enter_costs = [None if cell == WALL else (cost_model.diagonal or 0) + weights.get(cell, 0)
+                                     for cell in self.cells]
+        self.start = grid.find(ord('S')) * self.headings + self.headings // 4
+        end = grid.find(ord('E'))
+        self.goals = [end * self.headings + heading for heading in range(self.headings)]
+        self.size = len(self.cells) * self.headings
+
+    def edges(self, state):
+        """(next state, cost) of every move from state."""
+        cell, heading = divmod(state, self.headings)
+        base = cell * self.headings
+        model = self.cost_model
+        edges = [(base + (heading + 1) % self.headings, model.turn),
+                 (base + (heading - 1) % self.headings, model.turn)]
+        if model.reverse is not None:
+            edges.append((base + (heading + self.headings // 2) % self.headings, model.reverse))
+        ahead = cell + self.steps[heading]
+        costs = self.diagonal_enter_costs if heading % 2 and self.headings == 8 else self.enter_costs
+        if costs[ahead] is not None:
+            edges.append((ahead * self.headings + heading, costs[ahead]))
+        return edges
+
+    def edge_costs(self):
+        """All costs a move in this maze can have."""
+        model = self.cost_model
+        costs = {model.turn}
+        if model.reverse is not None:
+            costs.add(model.reverse)
+        costs.update(cost for cost in self.enter_costs if cost is not None)
+        if self.headings == 8:
+            costs.update(cost for cost in self.diagonal_enter_costs if cost is not None)
+        return costs
+
+    def score(self, distances):
+        return min(distances[goal] for goal in self.goals)
+
+
+def bfs_engine(graph, full=False):
+    """Breadth-first search, for mazes where every move has the same positive cost."""
+    cost = next(iter(graph.edge_costs()))
+    distances = [float('inf')] * graph.size
+    distances[graph.start] = 0
+    goals = set(graph.goals)
+    queue = deque([graph.start])
+    while queue:
+        state = queue.popleft()
+        if not full and state in goals:
+            break
+        for next_state, _ in graph.edges(state):
+            if distances[next_state] == float('inf'):
+                distances[next_state] = distances[state] + cost
+                queue.append(next_state)
+    return distances
+
+
+def zero_one_engine(graph, full=False):
+    """0-1 BFS, for mazes where moves are free or have one other cost."""
+    distances = [float('inf')] * graph.size
+    distances[graph.start] = 0
+    goals = set(graph.goals)
+    queue = deque([(0, graph.start)])
+    while queue:
+        distance, state = queue.popleft()
+        if distance > distances[state]:
+            continue
+        if not full and state in goals:
+            break
+        for next_state, cost in graph.edges(state):
+            if distance + cost < distances[next_state]:
+                distances[next_state] = distance + cost
+                if cost == 0:
+                    queue.appendleft((distance, next_state))
+                else:
+                    queue.append((distance + cost, next_state))
+    return distances
+
+
+def bucket_engine(graph, full=False):
+    """Dial's bucket queue, for integer move costs up to BUCKET_LIMIT. Buckets of the distances within
+    the largest move cost of the current one are kept in a ring."""
+    ring_size = max(graph.edge_costs()) + 1
+    distances = [float('inf')] * graph.size
+    distances[graph.start] = 0
+    goals = set(graph.goals)
+    buckets = [[] for _ in range(ring_size)]
+    buckets[0].append(graph.start)
+    pending = 1
+    distance = 0
+    while pending:
+        bucket = buckets[distance % ring_size]
+        while bucket:
+            state = bucket.pop()
+            pending -= 1
+            if distances[state] != distance:
+                continue  # reached by a cheaper path already
+            if not full and state in goals:
+                return distances
+            for next_state, cost in graph.edges(state):
+                if distance + cost < distances[next_state]:
+                    distances[next_state] = distance + cost
+                    buckets[(distance + cost) % ring_size].append(next_state)
+                    pending += 1
+        distance += 1
+    return distances
+
+
+def heap_engine(graph, full=False):
+    """Dijkstra's algorithm on a binary heap, for any non-negative move costs."""
+    distances = [float('inf')] * graph.size
+    distances[graph.start] = 0
+    goals = set(graph.goals)
+    queue = [(0, graph.start)]
+    while queue:
+        distance, state = heapq.heappop(queue)
+        if distance > distances[state]:
+            continue
+        if not full and state in goals:
+            break
+        for next_state, cost in graph.edges(state):
+            if distance + cost < distances[next_state]:
+                distances[next_state] = distance + cost
+                heapq.heappush(queue, (distance + cost, next_state))
+    return distances
+
+
+def wavefront_engine(graph, full=False):
+    """
+    Relaxes the whole distance field, one list of cells per heading, until a sweep changes nothing.
+    A sweep moves every heading forward along whole corridors by a doubling scan over shifted lists,
+    where the costs of runs of 2k cells are composed from runs of k cells and walls cost infinity,
+    and then relaxes the turns. The number of sweeps follows the number of turns on the best paths,
+    not their length. The field is always computed in full.
+    """
+    inf = float('inf')
+    headings = graph.headings
+    cell_count = len(graph.cells)
+    fields = [[inf] * cell_count for _ in range(headings)]
+    start_cell, start_heading = divmod(graph.start, headings)
+    fields[start_heading][start_cell] = 0
+    height = cell_count // graph.width
+    runs = [_run_costs(graph, heading, max(graph.width, height)) for heading in range(headings)]
+    model = graph.cost_model
+    turns = [(1, model.turn), (-1, model.turn)]
+    if model.reverse is not None:
+        turns.append((headings // 2, model.reverse))
+
+    while True:
+        previous = fields[:]
+        for heading in range(headings):
+            field = fields[heading]
+            for offset, costs in runs[heading]:
+                field = [a if a <= b + c else b + c for a, b, c in zip(field, _shifted(field, offset), costs)]
+            fields[heading] = field
+        for _ in range(headings // 2):
+            for heading in range(headings):
+                for rotation, cost in turns:
+                    other = fields[(heading - rotation) % headings]
+                    fields[heading] = [a if a <= b + cost else b + cost for a, b in zip(fields[heading], other)]
+        if fields == previous:
+            break
+    return [fields[heading][cell] for cell in range(cell_count) for heading in range(headings)]
+
+
+def _run_costs(graph, heading, length):
+    """(offset, costs) of forward runs of 1, 2, 4, ... cells along heading, shorter than length.
+    costs[i] is the cost of a run ending at cell i, infinite when it crosses a wall."""
+    inf = float('inf')
+    enter_costs = graph.diagonal_enter_costs if heading % 2 and graph.headings == 8 else graph.enter_costs
+    costs = [inf if cost is None else cost for cost in enter_costs]
+    step = graph.steps[heading]
+    runs = []
+    cells = 1
+    while cells < length:
+        runs.append((cells * step, costs))
+        costs = [a + b for a, b in zip(costs, _shifted(costs, cells * step))]
+        cells *= 2
+    return runs
+
+
+def _shifted(values, offset):
+    """values moved by offset, so that shifted[i] == values[i - offset], padded with infinity."""
+    if offset > 0:
+        return [float('inf')] * offset + values[:-offset]
+    return values[-offset:] + [float('inf')] * -offset
+
+
+ENGINES = {
+    "bfs": bfs_engine,
+    "zero_one": zero_one_engine,
+    "bucket": bucket_engine,
+    "heap": heap_engine,
+    "wavefront": wavefront_engine,
+}
+
+
+def applicable_engines(graph, wavefront=False):
+    """Names of the engines that solve the graph exactly, from the most specialized. The wavefront engine
+    solves every graph as well, but in pure Python it is slower than the heap even on open arenas, so it is
+    only listed when wavefront is set."""
+    costs = graph.edge_costs()
+    if min(costs) < 0:
+        raise ValueError(f"Move costs must be non-negative: {sorted(costs)}")
+    engines = []
+    if len(costs) == 1 and min(costs) > 0:
+        engines.append("bfs")
+    if len(costs - {0}) <= 1:
+        engines.append("zero_one")
+    if all(isinstance(cost, int) for cost in costs) and max(costs) <= BUCKET_LIMIT:
+        engines.append("bucket")
+    engines.append("heap")
+    if wavefront:
+        engines.append("wavefront")
+    return engines
+
+
+def select_engine(graph):
+    return applicable_engines(graph)[0]
+
+
+def solve_maze(maze_input, cost_model=DEFAULT_COST_MODEL, engine=None):
+    """Best score of the maze under the cost model, by the given engine or the most specialized one."""
+    graph = MazeGraph(maze_input, cost_model)
+    return graph.score(ENGINES[engine or select_engine(graph)](graph))
+
+
+def validate_engines(maze_input, cost_model=DEFAULT_COST_MODEL, wavefront=False):
+    """Solves the maze by every applicable engine, the wavefront engine too if wavefront is set, and raises
+    ValueError if one disagrees with the heap engine. Returns the best score."""
+    graph = MazeGraph(maze_input, cost_model)
+    expected = graph.score(heap_engine(graph))
+    for name in applicable_engines(graph, wavefront):
+        score = graph.score(ENGINES[name](graph))
+        if score != expected:
+            raise ValueError(f"Engine {name} scored {score}, the heap engine {expected}")
+    return expected
+
+
+class IncrementalMazeSolver:
+    """
+    Lifelong Planning A* over (cell, direction) states of the maze. After walls are toggled only the states
+    whose incoming moves changed are re-evaluated, and the search repairs the distances from them until the
+    best score is known again, instead of searching the whole maze from scratch.
+
+    States are flat indices of PaddedGrid cells times 4 plus the direction index (N, E, S, W). Reaching
+    the end cell in any direction is a zero cost move to the virtual GOAL state, stored last.
+
+    A repair that changes the best score re-expands nearly every state below it, several times slower than
+    solving the maze again. Batches of more than REBUILD_BATCH cells and repairs expanding more than
+    REPAIR_SHARE of the states settled by the last full search are therefore solved from scratch by the
+    engine solve_maze picks, and the next repair starts from the distances of that search.
+    """
+
+    GOAL = -1
+    FORWARD_COST = 1
+    TURN_COST = 1000
+    INFINITY = float('inf')
+    REBUILD_BATCH = 4
+    REPAIR_SHARE = 0.02
+
+    def __init__(self, maze_input):
+        self.grid = PaddedGrid.from_text(maze_input)
+        self.open = bytearray(cell != WALL for cell in self.grid.cells)
+        self.end = self.grid.find(ord('E'))
+        self.start_state = self.grid.find(ord('S')) * 4 + 1  # the reindeer starts facing east
+        self.steps = tuple(self.grid.offsets[name] for name in CARDINALS)
+        # Manhattan distance of every state to the end, every forward move costs at least FORWARD_COST
+        end_x, end_y = self.grid.position(self.end)
+        positions = map(self.grid.position, range(len(self.open)))
+        self.heuristic = [(abs(x - end_x) + abs(y - end_y)) * self.FORWARD_COST
+                          for x, y in positions for _ in range(4)] + [0]
+        self.g = []
+        self.rhs = []
+        self.queue = []
+        self.queued = {}
+        self.repair_limit = 0
+        self._rebuild()
+
+    def score(self):
+        """Best score from start to end, inf if the end can't be reached."""
+        if self.distances is not None:
+            return self.best
+        self._compute_shortest_path()
+        return self.g[self.GOAL]
+
+    def toggle_walls(self, cells):
+        """
+        Opens walls and closes open cells, then returns the new best score.
+
+        :param cells: (row, column) cells to toggle, except start and end.
+        :return: Best score after the change, inf if the end can't be reached.
+        """
+        changed = []
+        for r, c in cells:
+            if not (0 <= r < self.grid.height and 0 <= c < self.grid.width):
+                raise ValueError(f"Cell {(r, c)} is outside of the maze.")
+            cell = self.grid.index(c, r)
+            if cell in (self.start_state // 4, self.end):
+                raise ValueError(f"Start or end cell {(r, c)} can't be toggled.")
+            changed.append(cell)
+        if len(changed) > self.REBUILD_BATCH:
+            self._toggle(changed)
+            return self._rebuild()
+        if self.distances is not None:
+            self._seed()
+        self._toggle(changed)
+        for cell in changed:
+            # moves into the cell, turns within it and moves out of it to its neighbours changed
+            for direction, step in enumerate(self.steps):
+                self._update_state(cell * 4 + direction)
+                self._update_state((cell + step) * 4 + direction)
+        if self._compute_shortest_path(self.repair_limit):
+            return self.g[self.GOAL]
+        return self._rebuild()
+
+    def _toggle(self, cells):
+        for cell in cells:
+            self.open[cell] ^= 1
+            self.grid.cells[cell] = ord('.') if self.open[cell] else WALL
+
+    def _rebuild(self):
+        """Solves the current maze from scratch and returns the best score. The repair state is restored
+        from the distances only when the next batch is repaired."""
+        graph = MazeGraph(str(self.grid))
+        self.distances = ENGINES[select_engine(graph)](graph)
+        self.best = graph.score(self.distances)
+        return self.best
+
+    def _seed(self):
+        """Restores the repair state from the distances of the last full search. States closer than the
+        best score are settled with g and rhs equal to their distance, the states reached from them wait in
+        the queue, so the search continues as if it had just stopped at the end."""
+        best = self.best
+        inf = self.INFINITY
+        self.g = [distance if distance < best else inf for distance in self.distances] + [inf]
+        self.rhs = self.g[:]
+        self.queue = []
+        self.queued = {}
+        for state, distance in enumerate(self.distances):
+            if best <= distance < inf:
+                self._update_state(state)
+        self.repair_limit = int((len(self.g) - self.g.count(inf)) * self.REPAIR_SHARE)
+        self.distances = None
+
+    def _key(self, state):
+        best = min(self.g[state], self.rhs[state])
+        return best + self.heuristic[state], best
+
+    def _enqueue(self, state):
+        key = self._key(state)
+        self.queued[state] = key
+        heapq.heappush(self.queue, (key, state))
+
+    def _predecessors(self, state):
+        """(state, cost) of moves leading into state."""
+        if state == self.GOAL:
+            return [(self.end * 4 + direction, 0) for direction in range(4)]
+        cell, direction = divmod(state, 4)
+        if not self.open[cell]:
+            return []
+        predecessors = [(cell * 4 + (direction + 1) % 4, self.TURN_COST),
+                        (cell * 4 + (direction - 1) % 4, self.TURN_COST)]
+        back = cell - self.steps[direction]
+        if self.open[back]:
+            predecessors.append((back * 4 + direction, self.FORWARD_COST))
+        return predecessors
+
+    def _successors(self, state):
+        """States reachable from state by one move."""
+        cell, direction = divmod(state, 4)
+        if not self.open[cell]:
+            return []
+        successors = [cell * 4 + (direction + 1) % 4, cell * 4 + (direction - 1) % 4]
+        ahead = cell + self.steps[direction]
+        if self.open[ahead]:
+            successors.append(ahead * 4 + direction)
+        if cell == self.end:
+            successors.append(self.GOAL)
+        return successors
+
+    def _update_state(self, state):
+        g = self.g
+        if state != self.start_state:
+            self.rhs[state] = min((g[p] + cost for p, cost in self._predecessors(state)), default=self.INFINITY)
+        if g[state] != self.rhs[state]:
+            self._enqueue(state)
+        else:
+            self.queued.pop(state, None)
+
+    def _compute_shortest_path(self, limit=None):
+        """Expands inconsistent states until the score is known again. Returns False if more than limit
+        states had to be expanded, the repair state is left half repaired then."""
+        g = self.g
+        rhs = self.rhs
+        expanded = 0
+        while self.queue:
+            key, state = self.queue[0]
+            if self.queued.get(state) != key:
+                heapq.heappop(self.queue)  # outdated entry
+                continue
+            # moves into GOAL are free, so an end state can share its key and still has to be processed
+            if key > self._key(self.GOAL) and g[self.GOAL] == rhs[self.GOAL]:
+                break
+            heapq.heappop(self.queue)
+            del self.queued[state]
+            expanded += 1
+            if limit is not None and expanded > limit:
+                return False
+            if g[state] > rhs[state]:
+                g[state] = rhs[state]
+            else:
+                g[state] = self.INFINITY
+                self._update_state(state)
+            if state != self.GOAL:
+                for successor in self._successors(state):
+                    self._update_state(successor)
+        return True
+
+
+def parse(file_name):
+    with open(file_name, "r") as file:
+        return file.read()
+
+
+def solve(maze_input):
+    return solve_maze(maze_input)
+
+
 # Example usage
 if __name__ == "__main__":
-    with open("base_input.txt", "r") as file:
+    with open(INPUT_FILE, "r") as file:
         maze_input = file.read()
     print(reindeer_maze_solver(maze_input))
@@ -0,0 +1,81 @@
+"""
+Compares re-solving the maze after batches of wall toggles by `IncrementalMazeSolver` against solving the
+changed maze from scratch by `solve_maze`, and prints a CSV table of the average times per batch size.
+Every batch toggles random cells of the puzzle input and is toggled back afterwards, so all batches start
+from the same maze. Both timings include applying the toggles, to the solver or to the maze text. The
+second of two searches in a row runs faster on the memory the first one freed, so the order alternates.
+
+Run from the year directory, so the shared modules are found:
+    PYTHONPATH=. python 16/bench_incremental.py
+"""
+import argparse
+import csv
+import random
+import sys
+import time
+from pathlib import Path
+
+from base import IncrementalMazeSolver, solve_maze
+
+INPUT_FILE = Path(__file__).resolve().parent / "base_input.txt"
+BATCH_SIZES = (1, 2, 4, 10, 100, 1000)
+
+
+def toggled(rows: list[str], cells: list[tuple[int, int]]) -> str:
+    """Maze text with walls of cells opened and open cells closed."""
+    rows = [list(row) for row in rows]
+    for r, c in cells:
+        rows[r][c] = "." if rows[r][c] == "#" else "#"
+    return "\n".join("".join(row) for row in rows)
+
+
+def full_solve(rows: list[str], cells: list[tuple[int, int]]) -> int:
+    return solve_maze(toggled(rows, cells))
+
+
+def timed(function, *args) -> tuple[int, float]:
+    """Result of the call and its seconds."""
+    start = time.perf_counter()
+    result = function(*args)
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Times incremental re-solves against full ones.")
+    parser.add_argument("--input", type=Path, default=INPUT_FILE, help="maze to edit")
+    parser.add_argument("--rounds", type=int, default=10, help="batches per batch size")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the toggled cells")
+    args = parser.parse_args()
+
+    rows = args.input.read_text().split()
+    # the outer walls stay, so the maze keeps its border
+    cells = [(r, c) for r in range(1, len(rows) - 1) for c in range(1, len(rows[r]) - 1)
+             if rows[r][c] in "#."]
+    rng = random.Random(args.seed)
+    solver = IncrementalMazeSolver("\n".join(rows))
+    solver.score()
+
+    writer = csv.writer(sys.stdout)
+    writer.writerow(["cells", "rounds", "incremental_seconds", "full_seconds", "speedup"])
+    for size in BATCH_SIZES:
+        incremental_seconds = 0.0
+        full_seconds = 0.0
+        for round_index in range(args.rounds):
+            batch = rng.sample(cells, size)
+            if round_index % 2:
+                expected, full = timed(full_solve, rows, batch)
+                score, incremental = timed(solver.toggle_walls, batch)
+            else:
+                score, incremental = timed(solver.toggle_walls, batch)
+                expected, full = timed(full_solve, rows, batch)
+            incremental_seconds += incremental
+            full_seconds += full
+            if score != expected:
+                raise ValueError(f"Incremental score {score} differs from the full solve {expected}")
+            solver.toggle_walls(batch)
+        writer.writerow([size, args.rounds, f"{incremental_seconds / args.rounds:.6f}",
+                         f"{full_seconds / args.rounds:.6f}", f"{full_seconds / incremental_seconds:.2f}"])
+
+
+if __name__ == "__main__":
+    main()
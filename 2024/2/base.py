@@ -1,3 +1,5 @@
+import random
+
 
 def process_line(line: str) -> bool:
     numbers = [int(i) for i in line.split()]
@@ -30,6 +32,29 @@ def process_file(filename) -> int:
             line_count += 1
     return safe_count
 
+def parse(filename) -> list[str]:
+    with open(filename, "r") as f:
+        return f.readlines()
+
+
+def solve(lines: list[str]) -> int:
+    return sum(1 for line in lines if process_line(line))
+
+
+def generate(filename, scale: int = 1, seed: int = 0) -> None:
+    """Writes scale * 1000 random reports of 5-8 levels, like the puzzle input.
+    Steps of 0 and 4 make some of the reports unsafe."""
+    rng = random.Random(seed)
+    with open(filename, "w") as f:
+        for _ in range(1000 * scale):
+            level = rng.randint(1, 90)
+            direction = rng.choice((-1, 1))
+            levels = [level]
+            for _ in range(rng.randint(4, 7)):
+                level += direction * rng.choices((1, 2, 3, 0, 4), weights=(30, 30, 30, 4, 4))[0]
+                levels.append(level)
+            f.write(" ".join(str(level) for level in levels) + "\n")
+
 def main():
     res = process_file("base_input.txt")
     print(res)
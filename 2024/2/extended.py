@@ -1,3 +1,30 @@
+import hashlib
+import json
+import os
+import time
+from typing import NamedTuple, Generator
+
+CHUNK_SIZE = 1 << 20
+# bytes at the start of a followed file compared to tell a rewritten file from a grown one
+FINGERPRINT_SIZE = 256
+
+
+class ReportCounts(NamedTuple):
+    safe: int = 0
+    unsafe: int = 0
+    dampened_safe: int = 0
+    dampened_unsafe: int = 0
+
+
+class FollowState(NamedTuple):
+    """Progress of following a report file, stored in its state file between runs."""
+    offset: int = 0
+    device: int = 0
+    inode: int = 0
+    fingerprint: str = ""
+    counts: ReportCounts = ReportCounts()
+
+
 def parse_line(line: str) -> list[int]:
     return [int(i) for i in line.split()]
 
@@ -37,6 +64,100 @@ def process_file(filename) -> int:
             line_count += 1
     return safe_count
 
+def parse(filename) -> list[list[int]]:
+    with open(filename, "r") as f:
+        return [parse_line(line) for line in f]
+
+
+def solve(reports: list[list[int]]) -> int:
+    return sum(1 for numbers in reports if process_scrambled_line(numbers))
+
+
+def update_counts(filename, state_file=None) -> ReportCounts:
+    """
+    Counts strictly safe and dampened safe reports of an append-only file, processing only the complete
+    lines appended since the previous call. The offset and counts are kept in state_file between calls.
+    A file that was replaced (another inode), truncated or rewritten (another start) is counted again
+    from the start.
+
+    :param filename: Report file to follow.
+    :param state_file: File of the persisted state, `<filename>.state` by default.
+    :return: Counts of all complete reports in the file, empty lines are skipped.
+    """
+    state_file = state_file or filename + ".state"
+    state = _load_follow_state(state_file)
+    with open(filename, "rb") as f:
+        stat = os.fstat(f.fileno())
+        if ((stat.st_dev, stat.st_ino) != (state.device, state.inode)
+                or stat.st_size < state.offset
+                or _fingerprint(f, state.offset) != state.fingerprint):
+            state = FollowState(device=stat.st_dev, inode=stat.st_ino)
+        f.seek(state.offset)
+        safe, unsafe, dampened_safe, dampened_unsafe = state.counts
+        offset = state.offset
+        tail = b""
+        while chunk := f.read(CHUNK_SIZE):
+            data = tail + chunk
+            # a line without its line ending may still be written, it waits for the next call
+            end = data.rfind(b"\n") + 1
+            for line in data[:end].splitlines():
+                numbers = parse_line(line.decode())
+                if not numbers:
+                    continue
+                if process_line(numbers):
+                    safe += 1
+                else:
+                    unsafe += 1
+                if process_scrambled_line(numbers):
+                    dampened_safe += 1
+                else:
+                    dampened_unsafe += 1
+            # offset is where the unprocessed tail starts in the file
+            offset += end
+            tail = data[end:]
+        counts = ReportCounts(safe, unsafe, dampened_safe, dampened_unsafe)
+        state = FollowState(offset, stat.st_dev, stat.st_ino, _fingerprint(f, offset), counts)
+    _store_follow_state(state_file, state)
+    return counts
+
+
+def follow(filename, state_file=None, interval: float = 1.0) -> Generator[ReportCounts, None, None]:
+    """Yields the counts of `update_counts` now and whenever they change, checking every interval seconds.
+    While the file is missing, e.g. in the middle of a rotation, it is waited for."""
+    last = None
+    while True:
+        try:
+            counts = update_counts(filename, state_file)
+        except FileNotFoundError:
+            counts = last
+        if counts != last:
+            yield counts
+            last = counts
+        time.sleep(interval)
+
+
+def _fingerprint(f, offset: int) -> str:
+    """Hash of the processed start of the file, up to FINGERPRINT_SIZE bytes."""
+    f.seek(0)
+    return hashlib.sha256(f.read(min(offset, FINGERPRINT_SIZE))).hexdigest() if offset else ""
+
+
+def _load_follow_state(state_file) -> FollowState:
+    try:
+        with open(state_file) as f:
+            data = json.load(f)
+        return FollowState(**{**data, "counts": ReportCounts(*data["counts"])})
+    except (OSError, ValueError, TypeError, KeyError):
+        return FollowState()
+
+
+def _store_follow_state(state_file, state: FollowState) -> None:
+    temporary_file = f"{state_file}.{os.getpid()}.tmp"
+    with open(temporary_file, "w") as f:
+        json.dump(state._asdict(), f)
+    os.replace(temporary_file, state_file)
+
+
 def main():
     res = process_file("base_input.txt")
     print(res)
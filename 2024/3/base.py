@@ -1,7 +1,15 @@
 from collections import namedtuple
+import random
+from typing import TextIO
 
 ComputationResult = namedtuple("ComputationResult",["value", "next_index"])
 
+CHUNK_SIZE = 1 << 20
+MAX_MUL_LENGTH = len("mul(999,999)")
+STRESS_SIZE = 100 << 20
+# corrupt candidates in a row in stress inputs, far more than a parser recursing on each of them could nest
+STRESS_RUN = 100_000
+
 
 def parse_number(line: str, index: int) -> ComputationResult | None:
     """Parses 1-3 digit integral from the line starting at index. Returns None if a valid number is not found."""
@@ -18,41 +26,112 @@ def parse_number(line: str, index: int) -> ComputationResult | None:
 
 def parse_mul(line: str, index: int = 0) -> ComputationResult | None:
     """Parses the first occurrence of `mul(X,Y)` from the line starting at index. Returns None if
-     a valid mul is not found."""
-    if index >= len(line):
-        return None
-    mul_index = line.find("mul(", index)
-    if mul_index == -1:
-        return None
-    pos = mul_index + 4
-    x = parse_number(line, pos)
-    if x is None:
-        return parse_mul(line, pos)
-    pos = x.next_index
-    if line[pos] != ",":
-        return parse_mul(line, pos)
-    pos += 1
-    y = parse_number(line, pos)
-    if y is None:
-        return parse_mul(line, pos)
-    pos = y.next_index
-    if line[pos] != ")":
-        return parse_mul(line, pos)
-    return ComputationResult(value=x.value * y.value, next_index=pos)
+     a valid mul is not found.
+     Corrupt candidates are skipped in a loop, so any number of them can precede a valid mul."""
+    line_length = len(line)
+    while index < line_length:
+        mul_index = line.find("mul(", index)
+        if mul_index == -1:
+            return None
+        index = mul_index + 4
+        x = parse_number(line, index)
+        if x is None:
+            continue
+        index = x.next_index
+        if index >= line_length or line[index] != ",":
+            continue
+        index += 1
+        y = parse_number(line, index)
+        if y is None:
+            continue
+        index = y.next_index
+        if index >= line_length or line[index] != ")":
+            continue
+        return ComputationResult(value=x.value * y.value, next_index=index)
+    return None
+
+
+def sum_muls(line: str, index: int = 0) -> ComputationResult:
+    """Sums all valid `mul(X,Y)` in the line starting at index. Returns the sum together with
+    the index right after the last valid mul (or index if there is none)."""
+    num = 0
+    next_index = index
+    mul_res = parse_mul(line, index)
+    while mul_res is not None:
+        num += mul_res.value
+        next_index = mul_res.next_index + 1
+        mul_res = parse_mul(line, next_index)
+    return ComputationResult(value=num, next_index=next_index)
+
+
+def stream_sum_muls(stream: TextIO, chunk_size: int = CHUNK_SIZE) -> int:
+    """Sums all valid `mul(X,Y)` in the stream, reading it in chunks of chunk_size characters.
+    The tail of a chunk that may still hold the beginning of a mul is carried over to the next chunk,
+    so the result is the same as `sum_muls` over the whole content."""
+    num = 0
+    carry = ""
+    while chunk := stream.read(chunk_size):
+        data = carry + chunk
+        result = sum_muls(data)
+        num += result.value
+        # a mul starting before the last MAX_MUL_LENGTH - 1 characters was already decided
+        carry = data[max(result.next_index, len(data) - MAX_MUL_LENGTH + 1):]
+    return num
+
+
+def parse(file_name: str) -> str:
+    with open(file_name, "r") as f:
+        return f.read()
+
+
+def solve(data: str) -> int:
+    return sum_muls(data).value
+
+
+def generate(file_name: str, scale: int = 1, seed: int = 0) -> None:
+    """Writes scale * 6 lines of about 3000 characters of corrupted memory, like the puzzle input.
+    Valid muls are mixed with corrupted ones, other calls, `do()`/`don't()` and noise."""
+    rng = random.Random(seed)
+    tokens = [
+        lambda: f"mul({rng.randint(1, 999)},{rng.randint(1, 999)})",
+        lambda: f"mul({rng.randint(1, 999)},{rng.randint(1, 999)}]",
+        lambda: f"mul[{rng.randint(1, 999)},{rng.randint(1, 999)})",
+        lambda: f"mul({rng.randint(1, 999)} ,{rng.randint(1, 999)})",
+        lambda: rng.choice(["do()", "don't()", "what()", "from()", "select()", "how()"]),
+        lambda: rng.choice("!@#$%^&*()[]{}<>?,;:'~+- "),
+    ]
+    with open(file_name, "w") as f:
+        for _ in range(6 * scale):
+            line = []
+            length = 0
+            while length < 3000:
+                token = rng.choices(tokens, weights=(10, 2, 2, 2, 4, 20))[0]()
+                line.append(token)
+                length += len(token)
+            f.write("".join(line) + "\n")
+
 
+def generate_stress(file_name: str, seed: int = 0, size: int = STRESS_SIZE, run: int = STRESS_RUN) -> None:
+    """Writes about size characters of adversarial memory in lines of 400 tokens, like the puzzle input:
+    runs of run corrupt `mul(` candidates (missing or 4 digit numbers, wrong separators, cut before the
+    closing bracket), each followed by one valid mul."""
+    rng = random.Random(seed)
+    broken = ["mul(", "mul(1", "mul(12,", "mul(123,4", "mul(1234,5)", "mul(6,7890)", "mul(8;9)", "mul(1,2]",
+              "mul( 3,4)", "mul(5,6 )", "mulmul(", "mul(mul(", "mul(,)", "mul(7,)"]
+    with open(file_name, "w") as f:
+        written = 0
+        while written < size:
+            tokens = rng.choices(broken, k=run)
+            tokens.append(f"mul({rng.randint(1, 999)},{rng.randint(1, 999)})")
+            for start in range(0, len(tokens), 400):
+                line = "".join(tokens[start:start + 400]) + "\n"
+                f.write(line)
+                written += len(line)
 
 
 def main():
     with open("base_input.txt", "r") as f:
-        data = f.read()
-        num = 0
-        idx = 0
-        mul_res = parse_mul(data, idx)
-        while mul_res is not None:
-            num += mul_res.value
-            idx = mul_res.next_index
-            mul_res = parse_mul(data, idx)
-        print(num)
+        print(stream_sum_muls(f))
 
 
 if __name__ == "__main__":
@@ -1,8 +1,19 @@
 from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+import os
 import re
+from typing import TextIO, Generator
 
 ComputationResult = namedtuple("ComputationResult",["value", "next_index"])
 CallToken = namedtuple("CallToken", ["name", "index_position"])
+CallResult = namedtuple("CallResult", ["name", "value", "next_index"])
+ScanResult = namedtuple("ScanResult", ["value", "do_enabled", "next_index"])
+SegmentResult = namedtuple("SegmentResult", ["enabled_value", "disabled_value", "exit_state"])
+
+CALL_PATTERN = re.compile(r"([a-zA-Z']+)\([^\)]*\)")
+CHUNK_SIZE = 1 << 20
+SEGMENT_SIZE = 1 << 24
+MAX_CALL_LENGTH = len("mul(999,999)")
 
 
 def parse_number(line: str, index: int) -> ComputationResult | None:
@@ -54,46 +65,122 @@ def parse_empty_call(line: str, index: int, name: str) -> int | None:
 def find_next_call(line: str, index: int) -> CallToken | None:
     """Finds the first call in form of `call(arg1,arg2,..)` at `line[index:]` substring.
      Returns None if no call is found."""
-    regex = r"([a-zA-Z']+)\([^\)]*\)"
-    match = re.search(regex, line[index:])
+    match = CALL_PATTERN.search(line, index)
     if match is None:
         return None
-    return CallToken(name=match.group(1), index_position=index + match.start())
+    return CallToken(name=match.group(1), index_position=match.start())
+
+def iter_calls(line: str, index: int = 0, stop: int | None = None) -> Generator[CallResult, None, None]:
+    """Yields valid `mul(X,Y)`, `do()` and `don't()` calls found in `line[index:]` in order.
+    Only calls starting before stop are yielded. Valid calls never overlap, so a call is found
+    the same way no matter where the scan started."""
+    if stop is None:
+        stop = len(line)
+    call = find_next_call(line, index)
+    while call is not None and call.index_position < stop:
+        idx = call.index_position + 1
+        if call.name == "mul":
+            result = parse_mul(line, call.index_position)
+            if result:
+                idx = result.next_index
+                yield CallResult(name="mul", value=result.value, next_index=idx + 1)
+        elif call.name == "do" or call.name == "don't":
+            result = parse_empty_call(line, call.index_position, call.name)
+            if result is not None:
+                idx = result
+                yield CallResult(name=call.name, value=None, next_index=idx)
+        call = find_next_call(line, idx)
+
+
+def scan_calls(line: str, index: int = 0, do_enabled: bool = True) -> ScanResult:
+    """Sums all enabled `mul(X,Y)` calls in `line[index:]`, toggling by `do()` and `don't()` calls.
+    Returns the sum, the enabled state at the end and the index right after the last valid call."""
+    num = 0
+    next_index = index
+    for call in iter_calls(line, index):
+        if call.name == "mul":
+            if do_enabled:
+                num += call.value
+        else:
+            do_enabled = call.name == "do"
+        next_index = call.next_index
+    return ScanResult(value=num, do_enabled=do_enabled, next_index=next_index)
+
+
+def scan_segment(line: str, stop: int | None = None) -> SegmentResult:
+    """Scans calls starting in `line[:stop]` without knowing the enabled state at its start.
+    Returns the sums for both possible entry states and the exit state, which is None
+    if the segment contains no `do()` or `don't()` and keeps the entry state."""
+    prefix_value = 0
+    toggled_value = 0
+    exit_state = None
+    for call in iter_calls(line, 0, stop):
+        if call.name == "mul":
+            if exit_state is None:
+                prefix_value += call.value
+            elif exit_state:
+                toggled_value += call.value
+        else:
+            exit_state = call.name == "do"
+    return SegmentResult(enabled_value=prefix_value + toggled_value, disabled_value=toggled_value,
+                         exit_state=exit_state)
+
+
+def stream_scan_calls(stream: TextIO, chunk_size: int = CHUNK_SIZE) -> int:
+    """Sums all enabled `mul(X,Y)` calls in the stream, reading it in chunks of chunk_size characters.
+    The tail of a chunk that may still hold the beginning of a call is carried over to the next chunk
+    together with the enabled state, so the result is the same as `scan_calls` over the whole content."""
+    num = 0
+    do_enabled = True
+    carry = ""
+    while chunk := stream.read(chunk_size):
+        data = carry + chunk
+        result = scan_calls(data, do_enabled=do_enabled)
+        num += result.value
+        do_enabled = result.do_enabled
+        # a call starting before the last MAX_CALL_LENGTH - 1 characters was already decided
+        carry = data[max(result.next_index, len(data) - MAX_CALL_LENGTH + 1):]
+    return num
+
+
+def _scan_file_segment(file_name: str, start: int, end: int) -> SegmentResult:
+    """Scans calls starting in the byte range [start, end) of the file.
+    Reads MAX_CALL_LENGTH - 1 bytes past the end, so a call crossing the boundary is complete."""
+    with open(file_name, "rb") as f:
+        f.seek(start)
+        data = f.read(end - start + MAX_CALL_LENGTH - 1).decode("latin-1")
+    return scan_segment(data, end - start)
+
+
+def parallel_scan_calls(file_name: str, segment_size: int = SEGMENT_SIZE, workers: int | None = None) -> int:
+    """Sums all enabled `mul(X,Y)` calls in the file, scanning its segments in a process pool.
+    Each segment reports sums for both entry states, which are then reconciled in order
+    by the exit states of the preceding segments."""
+    file_size = os.path.getsize(file_name)
+    starts = range(0, file_size, segment_size)
+    ends = [min(start + segment_size, file_size) for start in starts]
+    num = 0
+    do_enabled = True
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for segment in executor.map(_scan_file_segment, [file_name] * len(starts), starts, ends):
+            num += segment.enabled_value if do_enabled else segment.disabled_value
+            if segment.exit_state is not None:
+                do_enabled = segment.exit_state
+    return num
+
+
+def parse(file_name: str) -> str:
+    with open(file_name, "r") as f:
+        return f.read()
+
+
+def solve(data: str) -> int:
+    return scan_calls(data).value
+
 
 def main():
     with open("base_input.txt", "r") as f:
-        data = f.read()
-        num = 0
-        idx = 0
-        do_enabled = True
-        call = find_next_call(data, idx)
-        while call is not None:
-            if call.name == "mul":
-                result = parse_mul(data, call.index_position)
-                if result:
-                    if do_enabled:
-                        num += result.value
-                    idx = result.next_index
-                else:
-                    idx = call.index_position + 1
-            elif call.name == "do":
-                result = parse_empty_call(data, call.index_position, "do")
-                if result is None:
-                    idx = call.index_position + 1
-                else:
-                    do_enabled = True
-                    idx = result
-            elif call.name == "don't":
-                result = parse_empty_call(data, call.index_position, "don't")
-                if result is None:
-                    idx = call.index_position + 1
-                else:
-                    do_enabled = False
-                    idx = result
-            else:
-                idx = call.index_position + 1
-            call = find_next_call(data, idx)
-        print(num)
+        print(stream_scan_calls(f))
 
 
 if __name__ == "__main__":
@@ -0,0 +1,30 @@
+import os
+import re
+import sys
+import tempfile
+import unittest
+
+from base import generate_stress, parse, solve, stream_sum_muls
+
+VALID_MUL = re.compile(r"mul\((\d{1,3}),(\d{1,3})\)")
+
+
+class StressTest(unittest.TestCase):
+
+    def test_corrupt_runs_longer_than_the_recursion_limit(self):
+        run = 100 * sys.getrecursionlimit()
+        with tempfile.TemporaryDirectory() as directory:
+            file_name = os.path.join(directory, "stress.txt")
+            generate_stress(file_name, size=1 << 20, run=run)
+            data = parse(file_name)
+            with open(file_name) as f:
+                streamed = stream_sum_muls(f)
+        first_valid = VALID_MUL.search(data).start()
+        self.assertGreaterEqual(data.count("mul(", 0, first_valid), run)
+        expected = sum(int(x) * int(y) for x, y in VALID_MUL.findall(data))
+        self.assertEqual(solve(data), expected)
+        self.assertEqual(streamed, expected)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,22 +1,320 @@
-from typing import Generator
+import mmap
+from collections import deque
+from pathlib import Path
+from typing import Generator, Iterable, NamedTuple
+
+from grid import DIRECTIONS, neighbor_offsets
+
+INPUT_FILE = Path(__file__).resolve().parent / "base_input.txt"
+
+BAND_HEIGHT = 1024
+WILDCARD = "."
+
+
+def find_all(haystack: bytes, needle: bytes) -> Generator[int, None, None]:
+    """Yields start indices of all (also overlapping) occurrences of needle in haystack."""
+    index = haystack.find(needle)
+    while index != -1:
+        yield index
+        index = haystack.find(needle, index + 1)
+
+
+def word_stencils(word: str) -> list[list[str]]:
+    """Returns stencils of word written in all 8 directions."""
+    stencils = []
+    for dx in (-1, 0, 1):
+        for dy in (-1, 0, 1):
+            if dx == 0 and dy == 0:
+                continue
+            size = len(word)
+            rows = [[WILDCARD] * (size if dx else 1) for _ in range(size if dy else 1)]
+            for i, letter in enumerate(word):
+                x = _stencil_index(i, dx, size)
+                y = _stencil_index(i, dy, size)
+                rows[y][x] = letter
+            stencils.append(["".join(row) for row in rows])
+    return stencils
+
+
+def _stencil_index(i: int, delta: int, size: int) -> int:
+    """Index of the i-th letter of a word of size written in the direction delta along one axis."""
+    if delta == 0:
+        return 0
+    return i if delta > 0 else size - 1 - i
+
+
+def cross_stencils(word: str) -> list[list[str]]:
+    """Returns stencils of an X-shaped cross with word on both diagonals, in either direction."""
+    if len(word) % 2 == 0:
+        raise ValueError(f"Cross pattern must have an odd length: {word}")
+    size = len(word)
+    stencils = set()
+    for diagonal in (word, word[::-1]):
+        for anti_diagonal in (word, word[::-1]):
+            rows = [[WILDCARD] * size for _ in range(size)]
+            for i in range(size):
+                rows[i][i] = diagonal[i]
+                rows[i][size - 1 - i] = anti_diagonal[i]
+            stencils.add(tuple("".join(row) for row in rows))
+    return [list(stencil) for stencil in sorted(stencils)]
+
+
+class WordMatch(NamedTuple):
+    """Cell of the first letter of a word found in the grid and the direction the word reads in."""
+    x: int
+    y: int
+    dx: int
+    dy: int
+
+
+class AhoCorasick:
+    """
+    Aho-Corasick automaton over byte patterns. Failure links are folded into a full transition table,
+    so a search is one table lookup per byte of the text, however many patterns there are.
+    """
+
+    def __init__(self, patterns: Iterable[bytes]):
+        self.patterns = list(patterns)
+        goto: list[dict[int, int]] = [{}]
+        self.outputs: list[list[int]] = [[]]
+        for pattern_id, pattern in enumerate(self.patterns):
+            if not pattern:
+                raise ValueError("Patterns must not be empty.")
+            state = 0
+            for byte in pattern:
+                if byte not in goto[state]:
+                    goto[state][byte] = len(goto)
+                    goto.append({})
+                    self.outputs.append([])
+                state = goto[state][byte]
+            self.outputs[state].append(pattern_id)
+
+        # breadth first, so the failure state (a shorter suffix) of every state is complete before it
+        self.transitions = [[0] * 256 for _ in goto]
+        failures = [0] * len(goto)
+        queue = deque([0])
+        while queue:
+            state = queue.popleft()
+            if state != 0:
+                self.outputs[state].extend(self.outputs[failures[state]])
+            row = self.transitions[state]
+            fallback = self.transitions[failures[state]]
+            for byte in range(256):
+                if byte in goto[state]:
+                    target = goto[state][byte]
+                    failures[target] = fallback[byte] if state != 0 else 0
+                    row[byte] = target
+                    queue.append(target)
+                else:
+                    row[byte] = fallback[byte] if state != 0 else 0
+
+    def search(self, text: bytes | mmap.mmap) -> Generator[tuple[int, int], None, None]:
+        """Yields (end index, pattern id) of all (also overlapping) pattern occurrences in text."""
+        transitions = self.transitions
+        outputs = self.outputs
+        state = 0
+        for index, byte in enumerate(memoryview(text)):
+            state = transitions[state][byte]
+            if outputs[state]:
+                for pattern_id in outputs[state]:
+                    yield index, pattern_id
 
 
 class SearchGrid:
 
     def __init__(self, file_name):
-        self.grid = self._load_file_to_str_list(file_name)
-        self.width = len(self.grid[0])
-        self.height = len(self.grid)
+        self._mmap = self._map_file(file_name)
+        end = len(self._mmap)
+        while end > 0 and self._mmap[end - 1] in b"\r\n":
+            end -= 1
+        self.width = self._mmap.find(b"\n", 0, end)
+        if self.width == -1:
+            self.width = end
+        line_ending = 1
+        if self.width > 0 and self._mmap[self.width - 1] == ord("\r"):
+            self.width -= 1
+            line_ending = 2
+        # every row is followed by a line ending separator, so the cell (x, y) is at flat[y * stride + x]
+        self.stride = self.width + line_ending
+        self.height = (end + line_ending) // self.stride
+        self.flat = memoryview(self._mmap)[:end]
+        # the line endings separate the rows like a border, so the grid offsets apply to the mapped file as is
+        self.offsets = neighbor_offsets(self.stride)
+        # flat index steps of rows, columns, diagonals and anti-diagonals
+        self.steps = tuple(self.offsets[name] for name in ("E", "S", "SE", "SW"))
+        self._step_directions = {self.offsets[name]: DIRECTIONS[name] for name in ("E", "S", "SE", "SW")}
 
-    def verticals(self) -> Generator[str, None, None]:
+    def close(self) -> None:
+        """Unmaps the file. Views of the grid handed out before must be released first."""
+        self.flat.release()
+        self._mmap.close()
+
+    def __enter__(self) -> "SearchGrid":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
+
+    def verticals(self) -> Generator[memoryview, None, None]:
         for i in range(self.height):
-            yield self.grid[i]
-            
-    def reverse_verticals(self) -> Generator[str, None, None]:
+            yield self.flat[i * self.stride:i * self.stride + self.width]
+
+    def reverse_verticals(self) -> Generator[memoryview, None, None]:
         for i in range(self.height-1, -1, -1):
-            yield self.grid[i][::-1]
+            yield self.flat[i * self.stride:i * self.stride + self.width][::-1]
+
+    def line_views(self, step: int) -> Generator[memoryview, None, None]:
+        """Yields strided views of lines along step over the mapped file, nothing is copied.
+        The separators make a line wrapping over the grid border continue only after a line ending,
+        so each view may hold several lines."""
+        for start in range(step):
+            yield self.flat[start::step]
+
+    def lines(self) -> Generator[bytes | mmap.mmap, None, None]:
+        """Yields all rows, columns, diagonals and anti-diagonals in a searchable form. Lines of one
+        direction can be joined by line ending separators, which are never part of a searched pattern."""
+        for step in self.steps:
+            yield from self._search_lines(step)
+
+    def count(self, pattern: str) -> int:
+        """Counts occurrences of pattern in all 8 directions, overlapping ones included.
+        Reading a line backwards is the same as searching it for the reversed pattern."""
+        needle = pattern.encode()
+        return sum(sum(1 for _ in find_all(line, n)) for line in self.lines() for n in (needle, needle[::-1]))
+
+    def count_cross(self, pattern: str = "MAS") -> int:
+        """Counts X-shaped crosses of pattern, where both diagonals through a common center read
+        pattern in either direction."""
+        if len(pattern) % 2 == 0:
+            raise ValueError(f"Cross pattern must have an odd length: {pattern}")
+        diagonal_centers = self._pattern_centers(pattern, self.offsets["SE"])
+        anti_diagonal_centers = self._pattern_centers(pattern, self.offsets["SW"])
+        return len(diagonal_centers & anti_diagonal_centers)
+
+    def count_words(self, words: Iterable[str]) -> dict[str, int]:
+        """Counts occurrences of every word in all 8 directions like `count`, streaming every line
+        through one automaton over all the words."""
+        counts = dict.fromkeys(words, 0)
+        for word, _, _ in self._word_matches(counts):
+            counts[word] += 1
+        return counts
+
+    def find_words(self, words: Iterable[str]) -> dict[str, list[WordMatch]]:
+        """Finds all occurrences of every word in all 8 directions, as in `count_words`."""
+        matches = {word: [] for word in words}
+        for word, index, step in self._word_matches(matches):
+            y, x = divmod(index, self.stride)
+            dx, dy = self._step_directions[abs(step)]
+            sign = 1 if step > 0 else -1
+            matches[word].append(WordMatch(x, y, sign * dx, sign * dy))
+        return matches
+
+    def _word_matches(self, words: Iterable[str]) -> Generator[tuple[str, int, int], None, None]:
+        """Yields (word, flat index of its first letter, flat step of its reading direction) of all
+        occurrences. Every word is searched as written and reversed, a reversed match reads backwards
+        from its last letter."""
+        words = list(words)
+        patterns = [word.encode() for word in words] + [word.encode()[::-1] for word in words]
+        automaton = AhoCorasick(patterns)
+        for step in self.steps:
+            for start, line in enumerate(self._search_lines(step)):
+                for end, pattern_id in automaton.search(line):
+                    word = words[pattern_id % len(words)]
+                    if pattern_id < len(words):
+                        yield word, start + (end - len(word) + 1) * step, step
+                    else:
+                        yield word, start + end * step, -step
+
+    def count_stencils(self, stencils: Iterable[list[str]], band_height: int = BAND_HEIGHT) -> int:
+        """Counts placements of 2D stencils in the grid. A stencil is a list of rows where each
+        letter must match and WILDCARD matches anything.
+
+        The grid is processed in bands of rows. For every letter of a band a big integer mask
+        with one byte per cell is built, a stencil then matches where all its letter masks,
+        shifted by the cell offsets, overlap. Each band is processed in a few C-level passes
+        and memory stays bounded by the band size."""
+        stencils = [self._stencil_cells(stencil) for stencil in stencils]
+        if not stencils:
+            return 0
+        pattern_width = max(dx for cells in stencils for dx, _, _ in cells) + 1
+        pattern_height = max(dy for cells in stencils for _, dy, _ in cells) + 1
+        letters = {letter for cells in stencils for _, _, letter in cells}
+        # separators wide enough for no stencil to wrap over to the next row
+        separator = b"\n" * pattern_width
+        band_stride = self.width + len(separator)
+        total = 0
+        for band_start in range(0, self.height, band_height):
+            band_end = min(band_start + band_height, self.height)
+            rows = [self.flat[y * self.stride:y * self.stride + self.width]
+                    for y in range(band_start, min(band_end + pattern_height - 1, self.height))]
+            band = separator.join(rows) + separator
+            masks = {letter: int.from_bytes(band.translate(_letter_table(letter)), "little")
+                     for letter in letters}
+            # only stencils anchored within the band are counted, the overlap belongs to the next one
+            anchors = (1 << (8 * band_stride * (band_end - band_start))) - 1
+            for cells in stencils:
+                matches = anchors
+                for dx, dy, letter in cells:
+                    matches &= masks[letter] >> (8 * (dy * band_stride + dx))
+                total += matches.bit_count()
+        return total
+
+    @staticmethod
+    def _stencil_cells(stencil: list[str]) -> list[tuple[int, int, str]]:
+        """Returns (dx, dy, letter) of the non-wildcard cells of stencil, relative to its top-left corner."""
+        cells = [(dx, dy, letter)
+                 for dy, row in enumerate(stencil)
+                 for dx, letter in enumerate(row)
+                 if letter != WILDCARD]
+        if not cells:
+            raise ValueError(f"Stencil has no letters: {stencil}")
+        min_x = min(dx for dx, _, _ in cells)
+        min_y = min(dy for _, dy, _ in cells)
+        return [(dx - min_x, dy - min_y, letter) for dx, dy, letter in cells]
+
+    def _pattern_centers(self, pattern: str, step: int) -> set[int]:
+        """Returns flat indices of centers of pattern occurrences (in either direction) along lines of step."""
+        needle = pattern.encode()
+        center_offset = len(pattern) // 2 * step
+        return {start + index * step + center_offset
+                for start, line in enumerate(self._search_lines(step))
+                for n in (needle, needle[::-1])
+                for index in find_all(line, n)}
+
+    def _search_lines(self, step: int) -> Generator[bytes | mmap.mmap, None, None]:
+        """Yields lines along step that support find. Rows are searched in the mapped file directly,
+        lines of other directions are copied from their views one at a time, so only one copy is
+        alive while it is searched."""
+        if step == 1:
+            yield self._mmap
+        else:
+            for view in self.line_views(step):
+                yield view.tobytes()
 
     @staticmethod
-    def _load_file_to_str_list(file_name: str) -> list[str]:
-        with open(file_name) as f:
-            return [l for l in f.read().splitlines() if len(l) > 0]
+    def _map_file(file_name: str) -> mmap.mmap:
+        with open(file_name, "rb") as f:
+            return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+def _letter_table(letter: str) -> bytes:
+    """Translation table mapping the letter to byte 1 and everything else to byte 0."""
+    return bytes(1 if i == ord(letter) else 0 for i in range(256))
+
+
+def parse(file_name: str) -> SearchGrid:
+    return SearchGrid(file_name)
+
+
+def solve(grid: SearchGrid) -> int:
+    return grid.count("XMAS")
+
+
+def main():
+    with SearchGrid(INPUT_FILE) as grid:
+        print(grid.count("XMAS"))
+        print(grid.count_cross("MAS"))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,190 @@
+import argparse
+import csv
+import json
+import resource
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import NamedTuple
+
+from run import CACHE_DIR, PARTS, YEAR_DIR, SolverJob, TimingRow, discover_solvers, load_solver, run_solver_safely
+
+BENCHMARKS_FILE = YEAR_DIR / "benchmarks.json"
+SCALED_DIR = CACHE_DIR / "scaled"
+DEFAULT_SCALE = 10
+DEFAULT_THRESHOLD = 1.5
+# differences below this many seconds are noise, not a regression
+NOISE_SECONDS = 0.05
+
+
+class BenchCase(NamedTuple):
+    day: int
+    part: str
+    name: str
+    input_file: Path
+
+    @property
+    def key(self) -> str:
+        return f"{self.day}/{self.part}/{self.name}"
+
+
+class BenchResult(NamedTuple):
+    case: BenchCase
+    row: TimingRow
+    peak_rss_kb: int
+
+    @property
+    def seconds(self) -> float | None:
+        if self.row.parse_seconds is None or self.row.solve_seconds is None:
+            return None
+        return self.row.parse_seconds + self.row.solve_seconds
+
+
+def scaled_input(day: int, scale: int, seed: int) -> Path | None:
+    """Generates (once) a scaled input of the day by the `generate` hook of its base solver.
+    Returns None if the day has no generator."""
+    return _generated_input(day, "generate", f"day{day}_x{scale}_seed{seed}.txt", scale, seed)
+
+
+def stress_input(day: int, seed: int) -> Path | None:
+    """Generates (once) an adversarial input of the day by the `generate_stress` hook of its base solver.
+    Returns None if the day has no stress generator."""
+    return _generated_input(day, "generate_stress", f"day{day}_stress_seed{seed}.txt", seed)
+
+
+def _generated_input(day: int, hook: str, file_name: str, *args) -> Path | None:
+    module = load_solver(day, "base")
+    if not hasattr(module, hook):
+        return None
+    path = SCALED_DIR / file_name
+    if not path.is_file():
+        path.parent.mkdir(parents=True, exist_ok=True)
+        temporary_path = path.with_suffix(".tmp")
+        getattr(module, hook)(str(temporary_path), *args)
+        temporary_path.replace(path)
+    return path
+
+
+def bench_cases(days: list[int] | None, parts: tuple[str, ...], scale: int, seed: int,
+                stress: bool = False) -> list[BenchCase]:
+    """Example, puzzle input, scaled input and optionally stress cases of the selected solvers,
+    if the inputs exist."""
+    cases = []
+    for day, part in discover_solvers(days, parts):
+        day_dir = YEAR_DIR / str(day)
+        example = day_dir / f"{part}_example.txt"
+        if not example.is_file():
+            example = day_dir / "base_example.txt"
+        if example.is_file():
+            cases.append(BenchCase(day, part, "example", example))
+        if (day_dir / "base_input.txt").is_file():
+            cases.append(BenchCase(day, part, "input", day_dir / "base_input.txt"))
+        if scale > 0:
+            scaled = scaled_input(day, scale, seed)
+            if scaled is not None:
+                cases.append(BenchCase(day, part, f"x{scale}", scaled))
+        if stress:
+            stressed = stress_input(day, seed)
+            if stressed is not None:
+                cases.append(BenchCase(day, part, "stress", stressed))
+    return cases
+
+
+def _measure(case: BenchCase) -> BenchResult:
+    """Runs a case in a fresh worker process, so the peak RSS belongs to this case only."""
+    row = run_solver_safely(SolverJob(case.day, case.part, case.input_file, None))
+    return BenchResult(case, row, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)
+
+
+def run_cases(cases: list[BenchCase]) -> list[BenchResult]:
+    """Runs the cases one by one, each in its own process so they do not disturb each other's timing."""
+    with ProcessPoolExecutor(max_workers=1, max_tasks_per_child=1) as executor:
+        return list(executor.map(_measure, cases))
+
+
+def compare(result: BenchResult, golden: dict | None, threshold: float, memory_threshold: float) -> str:
+    """Returns the status of the result against its recorded golden entry."""
+    if result.row.status != "ok":
+        return result.row.status
+    if golden is None:
+        return "new"
+    if result.row.answer != golden["answer"]:
+        return "wrong answer"
+    if (result.seconds > golden["seconds"] * threshold
+            and result.seconds - golden["seconds"] > NOISE_SECONDS):
+        return "slower"
+    if result.peak_rss_kb > golden["peak_rss_kb"] * memory_threshold:
+        return "more memory"
+    return "ok"
+
+
+def load_benchmarks(path: Path) -> dict[str, dict]:
+    if not path.is_file():
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def record(results: list[BenchResult], benchmarks: dict[str, dict], path: Path) -> None:
+    """Stores answers, timings and memory of successful results as the new golden entries."""
+    for result in results:
+        if result.row.status == "ok":
+            benchmarks[result.case.key] = {
+                "answer": result.row.answer,
+                "seconds": round(result.seconds, 6),
+                "peak_rss_kb": result.peak_rss_kb,
+            }
+    with open(path, "w") as f:
+        json.dump(dict(sorted(benchmarks.items(), key=lambda item: _key_order(item[0]))), f, indent=2)
+        f.write("\n")
+
+
+def _key_order(key: str) -> tuple[int, str, str]:
+    day, part, name = key.split("/")
+    return int(day), part, name
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Checks the solvers against golden answers and timing baselines.")
+    parser.add_argument("days", nargs="*", type=int, help="days to benchmark, all days by default")
+    parser.add_argument("--parts", nargs="+", choices=PARTS, default=list(PARTS), help="solver parts to benchmark")
+    parser.add_argument("--scale", type=int, default=DEFAULT_SCALE, help="size of generated inputs, 0 skips them")
+    parser.add_argument("--stress", action="store_true", help="also run the large adversarial inputs")
+    parser.add_argument("--seed", type=int, default=0, help="seed of generated inputs")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="fail when a case is this many times slower than its baseline")
+    parser.add_argument("--memory-threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="fail when a case needs this many times more memory than its baseline")
+    parser.add_argument("--record", action="store_true", help="record the results as the new golden entries")
+    parser.add_argument("--benchmarks", type=Path, default=BENCHMARKS_FILE, help="golden entries file")
+    args = parser.parse_args()
+
+    benchmarks = load_benchmarks(args.benchmarks)
+    results = run_cases(bench_cases(args.days or None, tuple(args.parts), args.scale, args.seed,
+                                        args.stress))
+
+    writer = csv.writer(sys.stdout)
+    writer.writerow(["case", "status", "answer", "seconds", "baseline_seconds", "peak_rss_kb", "baseline_peak_rss_kb"])
+    failed = False
+    for result in results:
+        golden = benchmarks.get(result.case.key)
+        status = compare(result, golden, args.threshold, args.memory_threshold)
+        failed |= status not in ("ok", "new")
+        writer.writerow([
+            result.case.key,
+            status,
+            "" if result.row.answer is None else result.row.answer,
+            "" if result.seconds is None else f"{result.seconds:.6f}",
+            "" if golden is None else golden["seconds"],
+            result.peak_rss_kb,
+            "" if golden is None else golden["peak_rss_kb"],
+        ])
+
+    if args.record:
+        record(results, benchmarks, args.benchmarks)
+    elif failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+Text grids stored as one flat bytearray with a one-cell border of walls around them.
+
+The cell (x, y) is at index (y + 1) * stride + x + 1 and a move is adding one of the neighbor offsets,
+the border stops every walk before it leaves the grid. Hot loops of the days can then step over plain
+integers, without bounds checks or coordinate tuples.
+
+The days import this module from the year directory. run.py and bench.py put it on the path, a day
+file run on its own needs it too, from the year directory:
+    PYTHONPATH=. python 16/base.py
+"""
+from typing import Iterable
+
+WALL = ord("#")
+# unit (dx, dy) moves clockwise from north, y grows downwards
+DIRECTIONS = {
+    "N": (0, -1),
+    "NE": (1, -1),
+    "E": (1, 0),
+    "SE": (1, 1),
+    "S": (0, 1),
+    "SW": (-1, 1),
+    "W": (-1, 0),
+    "NW": (-1, -1),
+}
+CARDINALS = ("N", "E", "S", "W")
+
+
+def neighbor_offsets(stride: int) -> dict[str, int]:
+    """Flat index deltas of the DIRECTIONS in a grid whose rows are stride apart."""
+    return {name: dy * stride + dx for name, (dx, dy) in DIRECTIONS.items()}
+
+
+class PaddedGrid:
+
+    def __init__(self, lines: Iterable[str | bytes], border: int = WALL):
+        rows = [(line.encode() if isinstance(line, str) else bytes(line)).rstrip(b"\r\n") for line in lines]
+        while rows and not rows[-1]:
+            rows.pop()
+        self.width = max((len(row) for row in rows), default=0)
+        self.height = len(rows)
+        self.stride = self.width + 2
+        self.border = border
+        pad = bytes([border])
+        self.cells = bytearray(pad * self.stride)
+        for row in rows:
+            # short rows are filled up with the border
+            self.cells += pad + row.ljust(self.width, pad) + pad
+        self.cells += pad * self.stride
+        self.offsets = neighbor_offsets(self.stride)
+
+    @classmethod
+    def from_text(cls, text: str, border: int = WALL) -> "PaddedGrid":
+        return cls(text.split("\n"), border)
+
+    @classmethod
+    def from_file(cls, file_name: str, border: int = WALL) -> "PaddedGrid":
+        with open(file_name, "rb") as file:
+            return cls(file, border)
+
+    def index(self, x: int, y: int) -> int:
+        return (y + 1) * self.stride + x + 1
+
+    def position(self, index: int) -> tuple[int, int]:
+        """(x, y) of the cell at index, the border is at -1 and width or height."""
+        y, x = divmod(index, self.stride)
+        return x - 1, y - 1
+
+    def find(self, value: int, start: int = 0) -> int:
+        """Index of the first cell with value from start on, or -1."""
+        return self.cells.find(value, start)
+
+    def find_all(self, value: int) -> list[int]:
+        indices = []
+        index = self.cells.find(value)
+        while index != -1:
+            indices.append(index)
+            index = self.cells.find(value, index + 1)
+        return indices
+
+    def inner_indices(self) -> Iterable[int]:
+        """Indices of all cells inside the border, row by row."""
+        for y in range(1, self.height + 1):
+            yield from range(y * self.stride + 1, y * self.stride + self.width + 1)
+
+    def __str__(self):
+        return "\n".join(self.cells[y * self.stride + 1:y * self.stride + self.width + 1].decode("latin-1")
+                         for y in range(1, self.height + 1))
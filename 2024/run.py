@@ -0,0 +1,164 @@
+import argparse
+import csv
+import hashlib
+import importlib.util
+import os
+import pickle
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from types import ModuleType
+from typing import NamedTuple
+
+YEAR_DIR = Path(__file__).resolve().parent
+CACHE_DIR = YEAR_DIR / ".cache"
+PARTS = ("base", "extended")
+INPUT_FILE = "base_input.txt"
+
+
+class SolverJob(NamedTuple):
+    day: int
+    part: str
+    input_file: Path
+    cache_dir: Path | None
+
+
+class TimingRow(NamedTuple):
+    day: int
+    part: str
+    status: str
+    cached: bool
+    parse_seconds: float | None
+    solve_seconds: float | None
+    answer: object
+
+
+def discover_solvers(days: list[int] | None = None, parts: tuple[str, ...] = PARTS) -> list[tuple[int, str]]:
+    """Finds `<day>/<part>.py` solvers in the year directory, ordered by day and part."""
+    solvers = []
+    for day_dir in YEAR_DIR.iterdir():
+        if not day_dir.is_dir() or not day_dir.name.isdigit():
+            continue
+        day = int(day_dir.name)
+        if days is not None and day not in days:
+            continue
+        solvers.extend((day, part) for part in parts if (day_dir / f"{part}.py").is_file())
+    return sorted(solvers, key=lambda solver: (solver[0], parts.index(solver[1])))
+
+
+def load_solver(day: int, part: str) -> ModuleType:
+    """Imports `<day>/<part>.py` under a unique module name, so parsed inputs can be unpickled.
+    The year directory is put on the import path first, so solvers can import the shared modules in it."""
+    if str(YEAR_DIR) not in sys.path:
+        sys.path.insert(0, str(YEAR_DIR))
+    name = f"day{day}_{part}"
+    if name in sys.modules:
+        return sys.modules[name]
+    spec = importlib.util.spec_from_file_location(name, YEAR_DIR / str(day) / f"{part}.py")
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+def _cache_path(job: SolverJob) -> Path:
+    """Cache file of a parsed input. The key changes whenever the solver or the input file changes."""
+    source = YEAR_DIR / str(job.day) / f"{job.part}.py"
+    key = "|".join(str(p.stat().st_mtime_ns) + str(p.stat().st_size) + str(p) for p in (source, job.input_file))
+    digest = hashlib.sha256(key.encode()).hexdigest()[:16]
+    return job.cache_dir / f"day{job.day}_{job.part}_{digest}.pickle"
+
+
+def _load_cached(cache_path: Path) -> tuple[bool, object]:
+    try:
+        with open(cache_path, "rb") as f:
+            return True, pickle.load(f)
+    except (OSError, pickle.UnpicklingError, EOFError):
+        return False, None
+
+
+def _store_cached(cache_path: Path, parsed: object) -> None:
+    """Stores the parsed input, inputs that cannot be pickled (e.g. memory-mapped ones) are skipped."""
+    try:
+        data = pickle.dumps(parsed)
+    except (pickle.PicklingError, TypeError, AttributeError):
+        return
+    cache_path.parent.mkdir(parents=True, exist_ok=True)
+    temporary_path = cache_path.with_suffix(f".{os.getpid()}.tmp")
+    temporary_path.write_bytes(data)
+    temporary_path.replace(cache_path)
+
+
+def run_solver(job: SolverJob) -> TimingRow:
+    """Runs parse and solve of one solver, timing them separately."""
+    if not job.input_file.is_file():
+        return TimingRow(job.day, job.part, "missing input", False, None, None, None)
+    module = load_solver(job.day, job.part)
+    if not hasattr(module, "parse") or not hasattr(module, "solve"):
+        return TimingRow(job.day, job.part, "no parse/solve", False, None, None, None)
+
+    start = time.perf_counter()
+    cached, parsed = False, None
+    if job.cache_dir is not None:
+        cached, parsed = _load_cached(_cache_path(job))
+    if not cached:
+        parsed = module.parse(str(job.input_file))
+    parse_seconds = time.perf_counter() - start
+    if job.cache_dir is not None and not cached:
+        _store_cached(_cache_path(job), parsed)
+
+    start = time.perf_counter()
+    answer = module.solve(parsed)
+    solve_seconds = time.perf_counter() - start
+    return TimingRow(job.day, job.part, "ok", cached, parse_seconds, solve_seconds, answer)
+
+
+def run_solver_safely(job: SolverJob) -> TimingRow:
+    try:
+        return run_solver(job)
+    except Exception as e:
+        return TimingRow(job.day, job.part, f"error: {type(e).__name__}: {e}", False, None, None, None)
+
+
+def run_all(jobs: list[SolverJob], workers: int | None = None) -> list[TimingRow]:
+    """Runs the jobs in a process pool, results are in the order of jobs."""
+    if workers == 1:
+        return [run_solver_safely(job) for job in jobs]
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(run_solver_safely, jobs))
+
+
+def write_table(rows: list[TimingRow], output) -> None:
+    writer = csv.writer(output)
+    writer.writerow(TimingRow._fields)
+    for row in rows:
+        writer.writerow([
+            row.day,
+            row.part,
+            row.status,
+            row.cached,
+            "" if row.parse_seconds is None else f"{row.parse_seconds:.6f}",
+            "" if row.solve_seconds is None else f"{row.solve_seconds:.6f}",
+            "" if row.answer is None else row.answer,
+        ])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Runs the solvers of selected days and prints a CSV timing table.")
+    parser.add_argument("days", nargs="*", type=int, help="days to run, all days by default")
+    parser.add_argument("--parts", nargs="+", choices=PARTS, default=list(PARTS), help="solver parts to run")
+    parser.add_argument("--input", default=INPUT_FILE, help="input file name inside the day directory")
+    parser.add_argument("--workers", type=int, default=None, help="number of worker processes, 1 runs inline")
+    parser.add_argument("--no-cache", action="store_true", help="always parse the inputs")
+    parser.add_argument("--cache-dir", type=Path, default=CACHE_DIR, help="directory of cached parsed inputs")
+    args = parser.parse_args()
+
+    cache_dir = None if args.no_cache else args.cache_dir.resolve()
+    jobs = [SolverJob(day, part, YEAR_DIR / str(day) / args.input, cache_dir)
+            for day, part in discover_solvers(args.days or None, tuple(args.parts))]
+    write_table(run_all(jobs, args.workers), sys.stdout)
+
+
+if __name__ == "__main__":
+    main()
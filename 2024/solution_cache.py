@@ -0,0 +1,70 @@
+"""
+Solutions of 2024/13 claw machines remembered between machines and, with a shelve file, between runs.
+
+Both parts of the day import this module from the year directory, run them from there:
+    PYTHONPATH=. python 13/extended.py
+"""
+import shelve
+from collections import OrderedDict
+from typing import Callable, Protocol
+
+
+class Machine(Protocol):
+
+    def normalized_key(self) -> tuple[int, ...]:
+        """Machine parameters such that machines with equal keys have equal solutions."""
+        ...
+
+
+class SolutionCache:
+    """
+    LRU cache of claw machine solutions keyed by the solver and the normalized machine parameters.
+    With a path, solutions are also stored in a shelve file, so they survive between runs.
+    """
+
+    def __init__(self, max_size: int = 100_000, path: str | None = None):
+        self.max_size = max_size
+        self.entries: OrderedDict[tuple, int | None] = OrderedDict()
+        self.store = shelve.open(path) if path is not None else None
+
+    def get(self, key: tuple) -> tuple[bool, int | None]:
+        """Returns whether the key is cached and its solution (None for an unreachable target)."""
+        if key in self.entries:
+            self.entries.move_to_end(key)
+            return True, self.entries[key]
+        if self.store is not None and repr(key) in self.store:
+            value = self.store[repr(key)]
+            self._remember(key, value)
+            return True, value
+        return False, None
+
+    def put(self, key: tuple, value: int | None) -> None:
+        self._remember(key, value)
+        if self.store is not None:
+            self.store[repr(key)] = value
+
+    def solve(self, search_space: Machine, solver: Callable[[Machine], int | None]) -> int | None:
+        """Returns the cached solution of search_space, running the solver (e.g. `SearchSpace.bfs`) on a miss."""
+        key = (solver.__name__,) + search_space.normalized_key()
+        found, value = self.get(key)
+        if not found:
+            value = solver(search_space)
+            self.put(key, value)
+        return value
+
+    def close(self) -> None:
+        if self.store is not None:
+            self.store.close()
+            self.store = None
+
+    def _remember(self, key: tuple, value: int | None) -> None:
+        self.entries[key] = value
+        self.entries.move_to_end(key)
+        if len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+
+    def __enter__(self) -> "SolutionCache":
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        self.close()